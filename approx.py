@@ -0,0 +1,143 @@
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from betweenness import batch_dependencies
+
+# 近似中介中心性与接近中心性: 无放回地逐批抽取源点, 每批源点的一次向量化最短路同时服务两种指标,
+# 用经验 Bernstein 界给出置信区间, 达到目标误差 (且前 k 名稳定)、时间预算或前 k 名已可区分时停止。
+# 渐进抽样: 样本量逐次倍增, 第 i 次检查使用 confidence / 2^(i+1), 各次检查合起来仍以 1 - confidence 成立;
+# 区间对每个节点各自成立 (不对全部节点取并集界, 否则范围项要求的样本量随 log n 增长, 中等规模的图上等于全部抽样)
+
+Estimate = namedtuple('Estimate', ['scores', 'lower', 'upper', 'samples', 'exact'])
+
+# 一次向量化最短路处理的 (源点数 x 弧数) 上限, 控制中间数组的内存
+BATCH_CELLS = 2 ** 22
+
+
+def bernstein_error(mean, sumsq, k, value_range, confidence, population):
+    # 经验 Bernstein 界 (Maurer & Pontil) 乘以无放回抽样的有限总体修正
+    k = np.asarray(k, dtype=float)
+    safe_k = np.maximum(k, 2)
+    var = np.maximum(sumsq / safe_k - mean ** 2, 0) * safe_k / (safe_k - 1)
+    log_term = math.log(2 / confidence)
+    error = np.sqrt(2 * var * log_term / safe_k) + 7 * value_range * log_term / (3 * (safe_k - 1))
+    fpc = np.sqrt(np.clip((population - k) / np.maximum(population - 1, 1), 0, 1))
+    with np.errstate(invalid='ignore'):
+        error = np.where(k < 2, np.inf, error) * fpc
+    return np.where(k >= population, 0.0, error)
+
+
+def top_k_separated(lower, upper, scores, k):
+    # 第 k 名的下界不低于其余节点的上界时, 前 k 名集合已确定
+    if k is None or k >= len(scores):
+        return False
+    order = np.argsort(-scores, kind='stable')
+    return lower[order[:k]].min() >= upper[order[k:]].max()
+
+
+def top_k_stable(previous, scores, k, epsilon):
+    # 前 k 名与上一次检查一致; 进出前 k 名的节点与第 k 名的估计值相差不超过 epsilon 时视为目标精度内的并列
+    current = np.argsort(-scores, kind='stable')[:k]
+    if previous is None:
+        return False, current
+    changed = np.setxor1d(previous, current)
+    return bool(np.all(np.abs(scores[changed] - scores[current[-1]]) <= epsilon)), current
+
+
+def approximate_centrality(graph, epsilon=0.05, confidence=0.05, time_budget=None, top_k=None,
+                           weighted=True, metrics=('betweenness', 'closeness'), batch_size=32, seed=42):
+    # graph 为 CSRGraph; 返回 {指标名: Estimate}, 数值含义与 networkx 的 normalized 结果一致
+    n = graph.n
+    arrays = (graph.indptr, graph.indices, graph.weights)
+    order = np.random.default_rng(seed).permutation(n)
+    start_time = time.perf_counter()
+    step = max(BATCH_CELLS // max(len(graph.indices), n, 1), 1)
+
+    bt_scale = 1 / ((n - 1) * (n - 2)) if n > 2 else 0.0
+    bt_sum = np.zeros(n)
+    bt_sumsq = np.zeros(n)
+
+    labels = graph.component_labels()
+    reach = np.bincount(labels)[labels] - 1
+    cl_count = np.zeros(n)
+    cl_sum = np.zeros(n)
+    cl_sumsq = np.zeros(n)
+    # 同一分量内任意两点距离不超过 2 * (任一源点的离心率)
+    comp_range = np.full(labels.max() + 1 if n else 0, np.inf)
+    min_step = float(graph.weights.min()) if weighted and len(graph.weights) else 1.0
+    # 样本量不足时仅中介中心性的范围项就超过 epsilon / 2, 不可能停止; 这些批次只跟踪前 k 名, 不消耗置信度
+    first_check = batch_size
+    if 'betweenness' in metrics:
+        first_check = math.inf if epsilon <= 0 else \
+            max(first_check, 14 * n * (n - 2) * bt_scale * math.log(4 / confidence) / (3 * epsilon) + 1)
+
+    k = 0
+    checks = 0
+    target = min(batch_size, n)
+    results = {}
+    previous_top = None
+    while k < n:
+        while k < target:
+            sources = order[k:min(target, k + step)]
+            dependency, dist = batch_dependencies(arrays, sources, n, weighted)
+            x = n * bt_scale * dependency
+            bt_sum += x.sum(axis=0)
+            bt_sumsq += (x * x).sum(axis=0)
+            reached = np.isfinite(dist)
+            np.minimum.at(comp_range, labels[sources], 2 * np.where(reached, dist, 0).max(axis=1))
+            reached[np.arange(len(sources)), sources] = False
+            dist = np.where(reached, dist, 0)
+            cl_count += reached.sum(axis=0)
+            cl_sum += dist.sum(axis=0)
+            cl_sumsq += (dist * dist).sum(axis=0)
+            k += len(sources)
+            if time_budget is not None and time.perf_counter() - start_time > time_budget:
+                break
+
+        out_of_time = time_budget is not None and time.perf_counter() - start_time > time_budget
+        checking = k >= first_check or k >= n or out_of_time
+        checks += checking
+        check_confidence = confidence / 2 ** max(checks, 1)
+        results = {}
+        if 'betweenness' in metrics:
+            mean = bt_sum / k
+            error = bernstein_error(mean, bt_sumsq, k, n * (n - 2) * bt_scale, check_confidence, n)
+            results['betweenness'] = Estimate(mean, np.maximum(mean - error, 0), mean + error, k, k >= n)
+        if 'closeness' in metrics:
+            counted = np.maximum(cl_count, 1)
+            mean_dist = cl_sum / counted
+            error = bernstein_error(mean_dist, cl_sumsq, cl_count, comp_range[labels], check_confidence, reach)
+            scale = reach / max(n - 1, 1)
+            lo_dist = np.maximum(mean_dist - error, min_step)
+            hi_dist = mean_dist + error
+            upper = np.divide(scale, lo_dist, out=np.zeros(n), where=reach > 0)
+            lower = np.divide(scale, hi_dist, out=np.zeros(n), where=(reach > 0) & np.isfinite(hi_dist))
+            scores = np.divide(scale, mean_dist, out=(lower + upper) / 2, where=(cl_count > 0) & (mean_dist > 0))
+            results['closeness'] = Estimate(scores, lower, upper, k, k >= n)
+
+        converged = checking and all(np.max(est.upper - est.lower, initial=0) / 2 <= epsilon
+                                     for est in results.values())
+        if top_k is not None and n:
+            # 指定 top_k 时还要求前 k 名集合与上一批一致 (目标精度内的并列除外), 置信区间已能区分前 k 名则直接停止
+            stable = {name: top_k_stable((previous_top or {}).get(name), est.scores, top_k, epsilon)
+                      for name, est in results.items()}
+            converged = converged and all(flag for flag, _ in stable.values())
+            previous_top = {name: top for name, (_, top) in stable.items()}
+            if checking and all(top_k_separated(est.lower, est.upper, est.scores, top_k) for est in results.values()):
+                break
+        if converged or out_of_time:
+            break
+        # 逐批倍增样本量
+        target = min(2 * target, n)
+    return results
+
+
+def approximate_betweenness(graph, **kwargs):
+    return approximate_centrality(graph, metrics=('betweenness',), **kwargs)['betweenness']
+
+
+def approximate_closeness(graph, **kwargs):
+    return approximate_centrality(graph, metrics=('closeness',), **kwargs)['closeness']
@@ -1,108 +1,320 @@
+import numpy as np
 import pandas as pd
-import networkx as nx
-import matplotlib.pyplot as plt
+import os
 import sys
+from edgestore import is_edge_store, load_edges, load_components, frame_to_edges, edges_to_frame
+from csrgraph import CSRGraph
+from centrality import eigenvector_centrality, pagerank, related_table
+from approx import approximate_centrality, approximate_betweenness
+from cache import MetricCache
+from layout import multilevel_layout, refine_layout, cached_layout
+from structural import structural_holes, top_nodes
+from community import consensus_louvain
+from paths import PathIndex
+from pipeline import Task, run_tasks, select_tasks, betweenness_tasks, cached_call
+from profiling import stage
+from temporal import is_temporal_store, collapse_years
 
+# 可选的指标名 (metrics 参数), 依赖的指标会一并计算
+METRICS = ('clustering', 'degree', 'betweenness', 'eigenvector', 'pagerank', 'related', 'holes', 'community', 'paths')
 
-def analyze_author_network(file_name):
+# Kamada-Kawai 需要全源最短路和 O(n^2) 矩阵, 超过此规模改用多层 Barnes-Hut 布局
+KAMADA_KAWAI_LIMIT = 1000
+
+
+def load_graph(file_name):
+    # 读取边数据, 返回 (CSR 图, 前几条边的预览表)
+    # 边文件自带连通分量编号时直接使用, 分量数与最大连通分量不再需要遍历
+    labels = None
+    if is_edge_store(file_name):
+        source, target, weights, names = load_edges(file_name)
+        components = load_components(file_name)
+        labels = components[0] if components is not None else None
+        if is_temporal_store(file_name):
+            # 按年份计数的边文件: 各年合并为静态网络
+            source, target, weights = collapse_years(source, target, weights)
+    else:
+        source, target, weights, names = frame_to_edges(pd.read_excel(file_name))
+    preview = edges_to_frame(source[:5], target[:5], weights[:5], names)
+    return CSRGraph.from_edges(source, target, weights, names, labels), preview
+
+
+def top_with_bounds(graph, estimate, column, k=10):
+    df_top = graph.top(estimate.scores, column, k)
+    order = np.argsort(-estimate.scores, kind='stable')[:k]
+    df_top['Lower'] = estimate.lower[order]
+    df_top['Upper'] = estimate.upper[order]
+    return df_top
+
+
+def main_layout(graph_main):
+    # 主图较小时用 Kamada-Kawai, 否则用多层 Barnes-Hut 布局
+    if graph_main.n <= KAMADA_KAWAI_LIMIT:
+        import networkx as nx
+        G_main = graph_main.to_networkx()
+        try:
+            pos = nx.kamada_kawai_layout(G_main)
+        except Exception as e:
+            pos = nx.spring_layout(G_main, seed=42)
+        return np.array([pos[node] for node in graph_main.names])
+    return multilevel_layout(graph_main, seed=42)
+
+
+def warm_layout(graph_main, initial, movable):
+    # 数据变化后从上次的坐标出发, 只细化新增或连接变化的作者
+    if graph_main.n <= KAMADA_KAWAI_LIMIT:
+        import networkx as nx
+        G_main = graph_main.to_networkx()
+        fixed = [node for node, move in zip(graph_main.names, movable) if not move] or None
+        pos = nx.spring_layout(G_main, pos=dict(zip(graph_main.names, initial)), fixed=fixed, seed=42)
+        return np.array([pos[node] for node in graph_main.names])
+    return refine_layout(graph_main, initial, movable)
+
+
+def approx_task(graph, approx_options):
+    return approximate_centrality(graph, weighted=True, top_k=10, **approx_options)
+
+
+def approx_component_task(graph, nodes, approx_options):
+    graph_main = graph if len(nodes) == graph.n else graph.subgraph(nodes)
+    return approximate_betweenness(graph_main, weighted=False, **approx_options).scores
+
+
+def related_task(graph, top_n, pagerank_scores):
+    related_seeds = top_nodes(pagerank_scores, top_n)
+    return related_table(graph, related_seeds, top_k=5, max_iter=1000) if len(related_seeds) else None
+
+
+def holes_task(graph, holes_top_n, betweenness_scores):
+    hole_nodes = None if holes_top_n is None else top_nodes(betweenness_scores, holes_top_n)
+    holes = structural_holes(graph, weighted=True, nodes=hole_nodes)
+    hole_nodes = np.arange(graph.n) if hole_nodes is None else hole_nodes
+    df_holes = pd.DataFrame({'Author': graph.names[hole_nodes], **holes})
+    return df_holes.sort_values(by='Constraint', kind='stable').head(10)
+
+
+def path_task(graph, path_queries):
+    path_index = PathIndex(graph)
+    sources, targets = zip(*path_queries)
+    return list(zip(path_queries, path_index.distances(sources, targets), path_index.paths(sources, targets)))
+
+
+def layout_task(graph, nodes, cache):
+    graph_main = graph if len(nodes) == graph.n else graph.subgraph(nodes)
+    return cached_layout(graph_main, cache, 'author_main', {'kamada_kawai': KAMADA_KAWAI_LIMIT},
+                         main_layout, warm_layout)
+
+
+def metric_tasks(graph, main_nodes, workers, approximate, approx_options, cache, holes_top_n, community_runs,
+                 path_queries, related_top_n):
+    # 分析流程的任务依赖图; 任务内部不再开进程池 (workers=1), 并行度由流水线的进程池提供,
+    # 中介中心性按源点拆成多块以占满进程池
+    chunks = workers * 4
+    tasks = [Task('clustering', CSRGraph.clustering_summary),
+             Task('degree', lambda graph: graph.degree_centrality(), local=True)]
+    if approximate:
+        tasks += [Task('approx', approx_task, (approx_options,)),
+                  Task('betweenness', lambda graph, estimates: estimates['betweenness'].scores, deps=('approx',),
+                       local=True)]
+    else:
+        tasks += betweenness_tasks('betweenness', graph, weighted=True, cache=cache, chunks=chunks)
+    tasks += [Task('eigenvector', cached_call, (cache, 'eigenvector', {'weighted': True, 'max_iter': 1000},
+                                                eigenvector_centrality, True, 1000)),
+              Task('pagerank', cached_call, (cache, 'pagerank', {'weighted': True, 'alpha': 0.85},
+                                             pagerank, 0.85, True, 1000)),
+              Task('related', related_task, (related_top_n,), deps=('pagerank',)),
+              Task('holes', holes_task, (holes_top_n,), deps=('betweenness',))]
+    if community_runs:
+        tasks.append(Task('community', consensus_louvain, (community_runs, 42, 1.0, 0.5, True, 1)))
+    if path_queries:
+        tasks.append(Task('paths', path_task, (path_queries,)))
+    tasks.append(Task('layout', layout_task, (main_nodes, cache)))
+    # 节点颜色: 最大连通分量上的无权中介中心性
+    if approximate:
+        tasks.append(Task('colors', approx_component_task, (main_nodes, approx_options)))
+    else:
+        tasks += betweenness_tasks('colors', graph, main_nodes, weighted=False, cache=cache, chunks=chunks)
+    return tasks
+
+
+def analyze_author_network(file_name, approx_error=None, time_budget=None, cache=None, raster=None, holes_top_n=100,
+                           community_runs=0, path_queries=None, related_top_n=3, workers=None, metrics=None,
+                           plot=True, output_image_file="author.png"):
+    # cache 为 MetricCache 时, 数据未变的重复运行直接读取精确指标和布局的缓存结果
+    # 指定 approx_error 或 time_budget 时, 中介/接近中心性改用自适应抽样近似
+    # raster 为 None 时边数超过 RASTER_EDGE_LIMIT 自动改用栅格绘制
+    # holes_top_n 为计算结构洞指标的作者数 (按中介中心性取前 N 位), None 表示全部作者
+    # community_runs 为并行 Louvain 的种子数, 默认 0 跳过社区检测 (单独的社区划分见 sna.py community)
+    # path_queries 为 [(作者A, 作者B), ...], 批量查询两位作者之间的最短合作路径
+    # related_top_n 为列出 "最相关作者" 的种子数 (PageRank 最高的前 N 位)
+    # workers 为指标流水线的进程数 (默认 CPU 核数), 各指标与布局并发计算, 结果按完成顺序输出
+    # metrics 为 METRICS 的子集时只计算这些指标; plot=False 时不计算布局也不绘图 (无需导入绘图库)
+    approximate = approx_error is not None or time_budget is not None
+    approx_options = {'epsilon': approx_error if approx_error is not None else 0.0, 'time_budget': time_budget}
+    workers = workers or os.cpu_count() or 1
     try:
-        df_edges = pd.read_excel(file_name)
+        with stage('load') as record:
+            graph, df_preview = load_graph(file_name)
+            if record is not None:
+                record['nodes'], record['edges'] = graph.n, graph.m
         print("数据预览:")
-        print(df_edges.head().to_markdown(index=False, numalign="left", stralign="left"))
+        print(df_preview.to_markdown(index=False, numalign="left", stralign="left"))
     except Exception as e:
         print(f"加载文件 {file_name} 时出错: {e}")
         return
 
     # 建立模型
-    G = nx.from_pandas_edgelist(df_edges, 'Source', 'Target', edge_attr=['Weight'], create_using=nx.Graph())
     print("\n--- 网络模型构建完成 ---")
 
     # 计算指标
     print("\n全局网络指标")
 
-    num_nodes = G.number_of_nodes()
-    num_edges = G.number_of_edges()
-    density = nx.density(G)
-    num_components = nx.number_connected_components(G)
+    num_nodes = graph.n
+    num_edges = graph.m
+    with stage('global', graph):
+        density = graph.density()
+        num_components = graph.number_connected_components()
 
     print(f"总节点数 (作者): {num_nodes}")
     print(f"总边数 (合作关系): {num_edges}")
     print(f"网络密度: {density:.6f}")
     print(f"连通分量数 (独立群组): {num_components}")
 
-    try:
-        avg_clustering = nx.average_clustering(G)
-        print(f"平均聚类系数: {avg_clustering:.6f}")
-    except Exception as e:
-        print(f"无法计算平均聚类系数: {e}")
+    main_nodes = graph.largest_component() if num_components > 1 else np.arange(num_nodes)
 
-    # 4. 计算节点层面指标
-    print("\n节点层面指标")
+    def print_table(title, df, **kwargs):
+        print(f"\n{title}")
+        print(df.to_markdown(index=False, numalign="left", stralign="left", **kwargs))
 
-    # 度中心性
-    degree_centrality = nx.degree_centrality(G)
-    df_degree = pd.DataFrame(degree_centrality.items(), columns=['Author', 'DegreeCentrality']).sort_values(
-        'DegreeCentrality', ascending=False)
-    print("\n度中心性 (连接最多的作者) 前十名:")
-    print(df_degree.head(10).to_markdown(index=False, numalign="left", stralign="left"))
+    def show_clustering(clustering):
+        print(f"平均聚类系数: {clustering['average_clustering']:.6f}")
+        print(f"传递性 (全局聚类系数): {clustering['transitivity']:.6f}")
 
-    # 中介中心性
-    try:
-        betweenness_centrality = nx.betweenness_centrality(G, weight='Weight', normalized=True)
-        df_betweenness = pd.DataFrame(betweenness_centrality.items(),
-                                      columns=['Author', 'BetweennessCentrality']).sort_values('BetweennessCentrality',
-                                                                                               ascending=False)
-        print("\n中介中心性 (关键桥梁) 前十名:")
-        print(df_betweenness.head(10).to_markdown(index=False, numalign="left", stralign="left"))
-    except Exception as e:
-        print(f"计算中介中心性时出错: {e}")
+    def show_degree(scores):
+        print("\n节点层面指标")
+        print_table("度中心性 (连接最多的作者) 前十名:", graph.top(scores, 'DegreeCentrality'))
 
-    # 特征向量中心性
-    try:
-        eigenvector_centrality = nx.eigenvector_centrality(G, weight='Weight', max_iter=1000)
-        df_eigenvector = pd.DataFrame(eigenvector_centrality.items(),
-                                      columns=['Author', 'EigenvectorCentrality']).sort_values('EigenvectorCentrality',
-                                                                                               ascending=False)
-        print("\n特征向量中心性 (最具影响力的连接) 前十名:")
-        print(df_eigenvector.head(10).to_markdown(index=False, numalign="left", stralign="left"))
-    except Exception as e:
-        print(f"计算特征向量中心性时出错: {e}")
+    def show_approx(estimates):
+        print(f"\n近似模式: 抽样 {estimates['betweenness'].samples}/{num_nodes} 个源点")
+        print_table("中介中心性 (关键桥梁) 前十名:",
+                    top_with_bounds(graph, estimates['betweenness'], 'BetweennessCentrality'))
+        print_table("接近中心性 (传播效率) 前十名:",
+                    top_with_bounds(graph, estimates['closeness'], 'ClosenessCentrality'))
+
+    def show_betweenness(scores):
+        # 近似模式的表格 (含置信区间) 已在 approx 任务完成时输出
+        if not approximate:
+            print_table("中介中心性 (关键桥梁) 前十名:", graph.top(scores, 'BetweennessCentrality'))
+
+    def show_related(df_related):
+        if df_related is not None:
+            print_table(f"与 PageRank 前 {df_related['Author'].nunique()} 位作者最相关的作者 (个性化 PageRank):",
+                        df_related, floatfmt=".6f")
+
+    def show_community(consensus):
+        sizes = np.bincount(consensus.labels)
+        print(f"\n社区检测: {community_runs} 次 Louvain 运行的共识划分")
+        print(f"社区数: {len(sizes)}, 最大的五个社区规模: {np.sort(sizes)[::-1][:5].tolist()}")
+        print(f"共识划分模块度: {consensus.consensus_modularity:.6f}")
+        print(f"各次运行模块度: {consensus.modularity.min():.6f} ~ {consensus.modularity.max():.6f}, "
+              f"平均稳定性: {consensus.stability.mean():.4f}")
+
+    def show_paths(answers):
+        print("\n作者间最短路径:")
+        for (a, b), length, path in answers:
+            print(f"{a} -> {b}: " + (f"距离 {length:g}, 路径 {' - '.join(path)}" if path else "不连通"))
+
+    # 各任务完成后的输出与出错提示
+    printers = {
+        'clustering': (show_clustering, "无法计算平均聚类系数"),
+        'degree': (show_degree, "计算度中心性时出错"),
+        'approx': (show_approx, "计算中介中心性时出错"),
+        'betweenness': (show_betweenness, "计算中介中心性时出错"),
+        'eigenvector': (lambda scores: print_table("特征向量中心性 (最具影响力的连接) 前十名:",
+                                                   graph.top(scores, 'EigenvectorCentrality')),
+                        "计算特征向量中心性时出错"),
+        'pagerank': (lambda scores: print_table("PageRank 前十名:", graph.top(scores, 'PageRank')),
+                     "计算 PageRank 时出错"),
+        'related': (show_related, "计算个性化 PageRank 时出错"),
+        'holes': (lambda df: print_table("结构洞 (约束度最低的作者) 前十名:", df), "计算结构洞指标时出错"),
+        'community': (show_community, "社区检测时出错"),
+        'paths': (show_paths, "查询最短路径时出错"),
+        'layout': (lambda pos: None, "计算布局时出错"),
+        'colors': (lambda scores: None, "计算节点颜色 (中介中心性) 时出错"),
+    }
+
+    tasks = metric_tasks(graph, main_nodes, workers, approximate, approx_options, cache, holes_top_n,
+                         community_runs, path_queries, related_top_n)
+    wanted = list(METRICS if metrics is None else metrics) + (['layout', 'colors'] if plot else [])
+    tasks = select_tasks(tasks, wanted)
+    # 聚类系数属于全局指标, 总在节点层面指标之前输出: 它完成之前先到的结果暂存, 之后按完成顺序补上
+    held = [] if any(task.name == 'clustering' for task in tasks) else None
+
+    def report(name, value, error):
+        nonlocal held
+        if name not in printers:
+            return
+        if held is not None and name != 'clustering':
+            held.append((name, value, error))
+            return
+        show, message = printers[name]
+        if error is not None:
+            print(f"{message}: {error}")
+        else:
+            show(value)
+        if name == 'clustering':
+            waiting, held = held, None
+            for item in waiting:
+                report(*item)
+
+    with stage('metrics', graph, workers=workers):
+        results = run_tasks(graph, tasks, workers, report)
+    if not plot or 'layout' not in results or 'colors' not in results:
+        return
 
     # 可视化
-    if num_components > 1:
-        largest_cc = max(nx.connected_components(G), key=len)
-        G_main = G.subgraph(largest_cc).copy()
-    else:
-        G_main = G.copy()
+    graph_main = graph if len(main_nodes) == num_nodes else graph.subgraph(main_nodes)
+    with stage('render', graph_main):
+        draw_author_network(graph_main, results['layout'], results['colors'], raster, output_image_file)
 
 
+def draw_author_network(graph_main, layout, node_colors, raster=None, output_image_file="author.png"):
+    # 绘图库只在需要出图时导入, 无图模式的批处理不承担 matplotlib 的启动开销
+    import matplotlib.pyplot as plt
+    import networkx as nx
+    from render import RASTER_EDGE_LIMIT, raster_edges, lod_nodes
 
     fig, ax = plt.subplots(figsize=(20, 20))
-    try:
-        pos = nx.kamada_kawai_layout(G_main)
-    except Exception as e:
-        pos = nx.spring_layout(G_main, seed=42)
-    degrees_main = dict(G_main.degree())
-    node_sizes = [degrees_main[n] * 20 + 10 for n in G_main.nodes()]
-    betweenness_main = nx.betweenness_centrality(G_main, normalized=True)
-    node_colors = [betweenness_main[n] for n in G_main.nodes()]
-    nodes = nx.draw_networkx_nodes(
-        G_main,
-        pos,
-        node_size=node_sizes,
-        node_color=node_colors,
-        cmap=plt.cm.viridis,
-        alpha=0.8,
-        ax=ax
-    )
-
-    nx.draw_networkx_edges(
-        G_main,
-        pos,
-        edge_color='grey',
-        alpha=0.15,
-        ax=ax
-    )
+    pos = dict(zip(graph_main.names, layout))
+    # G_main 的节点顺序与 graph_main 的编号一致
+    node_sizes = graph_main.degree() * 20 + 10
+    if raster is None:
+        raster = graph_main.m > RASTER_EDGE_LIMIT
+    if raster:
+        # 边画成密度栅格图, 节点保留矢量, 百万条边也能在数秒内出图
+        xy = np.array([pos[name] for name in graph_main.names])
+        source, target, _ = graph_main.edges()
+        raster_edges(ax, xy, source, target, edge_color='grey', alpha=0.15, dpi=300)
+        lod_nodes(ax, xy, node_sizes, node_colors, dpi=300, cmap=plt.cm.viridis, alpha=0.8)
+    else:
+        G_main = graph_main.to_networkx()
+        nodes = nx.draw_networkx_nodes(
+            G_main,
+            pos,
+            node_size=node_sizes,
+            node_color=node_colors,
+            cmap=plt.cm.viridis,
+            alpha=0.8,
+            ax=ax
+        )
+
+        nx.draw_networkx_edges(
+            G_main,
+            pos,
+            edge_color='grey',
+            alpha=0.15,
+            ax=ax
+        )
 
     ax.axis('off')
 
@@ -113,13 +325,15 @@ def analyze_author_network(file_name):
 
     cbar.set_label('Node Betweenness Centrality', rotation=270, labelpad=25, fontsize=15)
 
-    output_image_file = "author.png"
     fig.savefig(output_image_file, dpi=300, bbox_inches='tight')
+    plt.close(fig)
 
     print(f"\n可视化已保存至 '{output_image_file}'。")
 
 
 # --- 主程序执行 ---
 # 如果文件名不同，请替换为您的预处理文件名
-input_file = "preprocess.xlsx"
-analyze_author_network(input_file)
\ No newline at end of file
+# 多进程计算需要主模块保护
+if __name__ == '__main__':
+    input_file = "preprocess.edges"
+    analyze_author_network(input_file, cache=MetricCache())
\ No newline at end of file
@@ -0,0 +1,262 @@
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# 规模基准测试: 生成与文献导出格式相同的合成语料 (Author-作者 列以分号分隔, 团队规模为重尾分布),
+# 在 10^3 ~ 10^7 篇论文的各个规模上依次计时预处理与分析的每个阶段, 结果写成 JSON 便于不同版本之间比较
+#
+#   python benchmark.py --scales 1e3,1e4,1e5 --output bench.json
+#   python benchmark.py --scales 1e3,1e4,1e5 --output new.json --compare bench.json
+
+STAGES = ('parse', 'pairs', 'process', 'graph', 'degree', 'betweenness', 'eigenvector', 'pagerank', 'clustering',
+          'structural_holes', 'communities', 'layout', 'render')
+
+# 超过节点数上限的阶段跳过 (记为 skipped); 精确中介中心性超过上限时改为限时抽样近似
+STAGE_NODE_LIMITS = {'communities': 300000, 'layout': 3000000, 'render': 3000000}
+EXACT_BETWEENNESS_LIMIT = 10000
+
+SHARD_PAPERS = 10 ** 6
+
+
+def team_sizes(rng, papers, exponent=3.0, solo=0.1, max_team=1000):
+    # 多数论文 2~4 位作者, 少数大合作论文有数百位作者 (幂律尾), solo 比例的论文为独著
+    sizes = np.minimum(1 + rng.zipf(exponent, papers), max_team)
+    sizes[rng.random(papers) < solo] = 1
+    return sizes
+
+
+def draw_authors(rng, sizes, num_authors, popularity=0.8, locality=0.8, window=50):
+    # 第一作者按幂律热度抽取; 其余作者以 locality 的概率来自第一作者附近的编号 (形成稳定的合作圈子),
+    # 否则同样按热度抽取。返回 (作者编号, 每篇论文的起始位置), 论文内去重且第一作者在前
+    cdf = np.cumsum(np.arange(1, num_authors + 1, dtype=np.float64) ** -popularity)
+    cdf /= cdf[-1]
+    popular = lambda count: np.minimum(np.searchsorted(cdf, rng.random(count)), num_authors - 1)
+    paper = np.repeat(np.arange(len(sizes)), sizes)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    lead = popular(len(sizes))
+    authors = popular(len(paper))
+    near = rng.random(len(paper)) < locality
+    authors[near] = (lead[paper[near]] + rng.integers(-window, window + 1, near.sum())) % num_authors
+    authors[offsets[:-1]] = lead
+    _, first = np.unique(paper.astype(np.int64) * num_authors + authors, return_index=True)
+    keep = np.sort(first)
+    return authors[keep], np.concatenate([[0], np.cumsum(np.bincount(paper[keep], minlength=len(sizes)))])
+
+
+def synthetic_corpus(directory, papers, authors=None, seed=42, shard_papers=SHARD_PAPERS):
+    # 生成 CSV 分片 (与 ingest.py 的多文件输入兼容), 已存在时直接复用; 返回分片目录
+    path = os.path.join(directory, f"papers_{papers}_seed_{seed}")
+    if os.path.isfile(os.path.join(path, 'done')):
+        return path
+    os.makedirs(path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    num_authors = authors or max(papers, 10)
+    names = np.array([f"作者{i:08d}" for i in range(num_authors)], dtype=object)
+    for shard, start in enumerate(range(0, papers, shard_papers)):
+        count = min(shard_papers, papers - start)
+        codes, offsets = draw_authors(rng, team_sizes(rng, count), num_authors)
+        labels = names[codes].tolist()
+        author_column = [';'.join(labels[offsets[i]:offsets[i + 1]]) for i in range(count)]
+        pd.DataFrame({
+            'Title-题名': [f"Synthetic paper {start + i}" for i in range(count)],
+            'Author-作者': author_column,
+            'Source-文献来源': [f"期刊{j}" for j in rng.integers(0, 200, count)],
+        }).to_csv(os.path.join(path, f"shard_{shard:04d}.csv"), index=False)
+    open(os.path.join(path, 'done'), 'w').close()
+    return path
+
+
+def max_rss():
+    # 本进程与已结束子进程的常驻内存峰值 (字节); Linux 上 ru_maxrss 以 KB 为单位
+    scale = 1 if sys.platform == 'darwin' else 1024
+    usage = [resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return max(usage) * scale
+
+
+class StageTimer:
+    def __init__(self, scale, trace_memory=False):
+        self.scale = scale
+        self.trace_memory = trace_memory
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, graph=None, **extra):
+        record = {'papers': self.scale, 'stage': name, 'nodes': graph.n if graph is not None else None,
+                  'edges': graph.m if graph is not None else None, **extra}
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            if self.trace_memory:
+                record['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            record['max_rss_bytes'] = max_rss()
+            self.records.append(record)
+            print(f"  {name:<18} {record['seconds']:>9.3f} s" + (
+                f"  峰值 {record['peak_bytes'] / 2 ** 20:,.1f} MB" if self.trace_memory else '') + (
+                f"  {record['note']}" if record.get('note') else ''))
+
+    def skip(self, name, graph, reason):
+        self.records.append({'papers': self.scale, 'stage': name, 'nodes': graph.n, 'edges': graph.m,
+                             'skipped': reason})
+        print(f"  {name:<18}  跳过: {reason}")
+
+
+def run_scale(papers, args):
+    from ingest import expand_inputs, iter_author_chunks, count_files
+    from pairs import encode_authors, count_pairs
+    from edgestore import save_edge_frame
+    from author import load_graph
+    from betweenness import betweenness_centrality
+    from approx import approximate_betweenness
+    from centrality import eigenvector_centrality, pagerank
+    from structural import structural_holes, top_nodes
+    from community import consensus_louvain
+    from layout import multilevel_layout
+
+    corpus = synthetic_corpus(args.data_dir, papers, seed=args.seed)
+    timer = StageTimer(papers, args.memory)
+    skip = set(args.skip or ())
+    print(f"\n{papers:,} 篇论文 ({corpus})")
+
+    files = expand_inputs(corpus)
+    with timer.stage('parse'):
+        authors = pd.concat([chunk for path in files for chunk in iter_author_chunks(path)], ignore_index=True)
+    with timer.stage('pairs'):
+        codes, offsets, names = encode_authors(authors)
+        count_pairs(codes, offsets, len(names))
+    del authors, codes, offsets, names
+    # process.py 的完整路径: 多文件并行分块计数、归并并写出边文件
+    store = os.path.join(corpus, 'preprocess.edges')
+    with timer.stage('process'):
+        save_edge_frame(store, count_files(files, workers=args.workers))
+    with timer.stage('graph'):
+        graph = load_graph(store)[0]
+
+    xy = None
+    for name in STAGES[4:]:
+        if name == 'render' and xy is None:
+            timer.skip(name, graph, '没有布局结果')
+            continue
+        if name in skip:
+            timer.skip(name, graph, '--skip')
+            continue
+        if graph.n > STAGE_NODE_LIMITS.get(name, np.inf):
+            timer.skip(name, graph, f"节点数超过 {STAGE_NODE_LIMITS[name]}")
+            continue
+        try:
+            with timer.stage(name, graph) as record:
+                if name == 'degree':
+                    graph.degree_centrality()
+                elif name == 'betweenness':
+                    if graph.n <= args.exact_limit:
+                        betweenness_centrality(graph, workers=args.workers)
+                    else:
+                        estimate = approximate_betweenness(graph, epsilon=0.0, time_budget=args.approx_budget)
+                        record['note'] = f"近似: 抽样 {estimate.samples}/{graph.n} 个源点"
+                elif name == 'eigenvector':
+                    eigenvector_centrality(graph, max_iter=1000)
+                elif name == 'pagerank':
+                    pagerank(graph, max_iter=1000)
+                elif name == 'clustering':
+                    graph.clustering_summary()
+                elif name == 'structural_holes':
+                    structural_holes(graph, nodes=top_nodes(graph.degree(), 100))
+                elif name == 'communities':
+                    consensus_louvain(graph, runs=args.community_runs, workers=args.workers)
+                elif name == 'layout':
+                    graph_main = graph.subgraph(graph.largest_component())
+                    xy = multilevel_layout(graph_main, seed=42)
+                elif name == 'render':
+                    render_figure(graph_main, xy)
+        except Exception as e:
+            timer.records[-1]['error'] = str(e)
+            print(f"  {name} 出错: {e}")
+    return timer.records
+
+
+def render_figure(graph_main, xy):
+    # 与 author.py 大图模式相同的绘制方式, 输出到内存
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from render import raster_edges, lod_nodes
+    fig, ax = plt.subplots(figsize=(20, 20))
+    source, target, _ = graph_main.edges()
+    raster_edges(ax, xy, source, target, edge_color='grey', alpha=0.15, dpi=300)
+    lod_nodes(ax, xy, graph_main.degree() * 20 + 10, graph_main.degree(), dpi=300, alpha=0.8)
+    ax.axis('off')
+    fig.savefig(io.BytesIO(), dpi=300, bbox_inches='tight')
+    plt.close(fig)
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'commit': commit, 'python': platform.python_version(), 'numpy': np.__version__,
+            'pandas': pd.__version__, 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(results, baseline_path):
+    # 按 (规模, 阶段) 与基线结果对比耗时, 比值大于 1 表示变慢
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    old = {(r['papers'], r['stage']): r.get('seconds') for r in baseline['results']}
+    rows = [{'Papers': r['papers'], 'Stage': r['stage'], 'Baseline': old.get((r['papers'], r['stage'])),
+             'Current': r.get('seconds')} for r in results]
+    table = pd.DataFrame(rows).dropna()
+    table['Ratio'] = table['Current'] / table['Baseline']
+    print(f"\n与基线 {baseline_path} (提交 {baseline['environment'].get('commit') or '未知'}) 的对比:")
+    print(table.to_markdown(index=False, numalign="left", stralign="left", floatfmt=".3f"))
+    return table
+
+
+def parse_scales(text):
+    return [int(float(value)) for value in text.split(',') if value.strip()]
+
+
+# 多进程在 Windows 下需要主模块保护
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='作者合作网络规模基准测试')
+    parser.add_argument('--scales', type=parse_scales, default=parse_scales('1e3,1e4,1e5'),
+                        help='论文数, 逗号分隔, 如 1e3,1e4,1e5,1e6,1e7')
+    parser.add_argument('--data-dir', default='bench_data', help='合成语料目录 (按规模与种子复用)')
+    parser.add_argument('--output', default='benchmark.json', help='结果 JSON 文件')
+    parser.add_argument('--compare', help='与之比较的基线结果 JSON')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, help='并行进程数, 默认 CPU 核数')
+    parser.add_argument('--memory', action='store_true', help='用 tracemalloc 记录每个阶段的内存峰值 (会变慢)')
+    parser.add_argument('--exact-limit', type=int, default=EXACT_BETWEENNESS_LIMIT,
+                        help='节点数不超过该值时计算精确中介中心性, 否则限时抽样近似')
+    parser.add_argument('--approx-budget', type=float, default=30.0, help='近似中介中心性的时间预算 (秒)')
+    parser.add_argument('--community-runs', type=int, default=4, help='社区检测的 Louvain 种子数')
+    parser.add_argument('--skip', type=lambda text: text.split(','), help='跳过的阶段, 逗号分隔')
+    args = parser.parse_args()
+
+    results = []
+    for papers in args.scales:
+        results.extend(run_scale(papers, args))
+    report = {'environment': environment(), 'results': results}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1, default=float)
+    print(f"\n结果已保存至 '{args.output}'。")
+    if args.compare:
+        compare(results, args.compare)
@@ -0,0 +1,231 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from heapq import heappush, heappop
+from itertools import count
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# 精确中介中心性 (Brandes 算法): 源点分块后交给进程池, 图数组经共享内存只传一次
+
+_GRAPH = None
+_SHARED = []
+
+
+def _neighbors(graph, v):
+    indptr, indices, weights = graph
+    start, stop = indptr[v], indptr[v + 1]
+    return indices[start:stop].tolist(), weights[start:stop].tolist()
+
+
+def single_source_dijkstra(graph, s, n):
+    # 与 networkx 的 _single_source_dijkstra_path_basic 相同的计数规则
+    S = []
+    P = {s: []}
+    sigma = {s: 1.0}
+    D = {}
+    seen = {s: 0}
+    c = count()
+    Q = [(0, next(c), s, s)]
+    while Q:
+        dist, _, pred, v = heappop(Q)
+        if v in D:
+            continue
+        if v != s:
+            sigma[v] += sigma[pred]
+        S.append(v)
+        D[v] = dist
+        nbrs, wts = _neighbors(graph, v)
+        for w, weight in zip(nbrs, wts):
+            vw_dist = dist + weight
+            if w not in D and (w not in seen or vw_dist < seen[w]):
+                seen[w] = vw_dist
+                heappush(Q, (vw_dist, next(c), v, w))
+                sigma[w] = 0.0
+                P[w] = [v]
+            elif vw_dist == seen.get(w):
+                sigma[w] += sigma[v]
+                P[w].append(v)
+    return S, P, sigma, D
+
+
+def single_source_bfs(graph, s, n):
+    S = []
+    P = {s: []}
+    sigma = {s: 1.0}
+    D = {s: 0}
+    Q = deque([s])
+    while Q:
+        v = Q.popleft()
+        S.append(v)
+        Dv = D[v]
+        sigmav = sigma[v]
+        for w in _neighbors(graph, v)[0]:
+            if w not in D:
+                Q.append(w)
+                D[w] = Dv + 1
+                sigma[w] = 0.0
+                P[w] = []
+            if D[w] == Dv + 1:
+                sigma[w] += sigmav
+                P[w].append(v)
+    return S, P, sigma, D
+
+
+def accumulate(betweenness, S, P, sigma, s):
+    delta = dict.fromkeys(S, 0)
+    while S:
+        w = S.pop()
+        coeff = (1 + delta[w]) / sigma[w]
+        for v in P[w]:
+            delta[v] += sigma[v] * coeff
+        if w != s:
+            betweenness[w] += delta[w]
+    return delta
+
+
+def betweenness_from_sources(graph, sources, n, weighted=True):
+    # 返回给定源点集合的未缩放依赖度之和
+    sssp = single_source_dijkstra if weighted else single_source_bfs
+    betweenness = np.zeros(n)
+    for s in sources:
+        S, P, sigma, _ = sssp(graph, int(s), n)
+        accumulate(betweenness, S, P, sigma, int(s))
+    return betweenness
+
+
+def batch_dependencies(graph, sources, n, weighted=True):
+    # 向量化的 Brandes: 一批源点的最短路距离由 scipy.sparse.csgraph 一次求出, 最短路 DAG 上的路径数与依赖度
+    # 在所有 (源点, 弧) 对上同步迭代到不动点 (迭代次数为 DAG 的最大跳数)。
+    # 返回 (依赖度, 距离), 形状均为 (源点数, n), 不可达为 inf; 计数规则与 single_source_dijkstra / accumulate 相同
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra
+    indptr, indices, weights = graph
+    sources = np.asarray(sources, dtype=np.int64)
+    runs = len(sources)
+    lengths = np.asarray(weights, dtype=np.float64) if weighted else np.ones(len(indices))
+    dist = dijkstra(csr_matrix((lengths, indices, indptr), shape=(n, n)), indices=sources)
+    dist = dist.reshape(runs, n)
+    degree = np.diff(indptr)
+    rows = np.repeat(np.arange(n), degree)
+    # 弧 u->v 在源点 j 的 DAG 上当且仅当 dist[j, u] + w == dist[j, v] (与 networkx 相同的精确相等判断);
+    # 不可达记为 nan, 比较结果恒为 False
+    reachable = np.where(np.isfinite(dist), dist, np.nan)
+    run, arc = np.nonzero(np.repeat(reachable, degree, axis=1) + lengths == np.take(reachable, indices, axis=1))
+    del reachable
+    offset = run * n
+    tail, head = offset + rows[arc], offset + indices[arc]
+    start = np.arange(runs) * n + sources
+    base = np.zeros(runs * n)
+    base[start] = 1.0
+    sigma = base
+    while True:
+        updated = base + np.bincount(head, weights=sigma[tail], minlength=runs * n)
+        if np.array_equal(updated, sigma):
+            break
+        sigma = updated
+    ratio = sigma[tail] / sigma[head]
+    delta = np.zeros(runs * n)
+    while True:
+        updated = np.bincount(tail, weights=ratio * (1 + delta[head]), minlength=runs * n)
+        if np.array_equal(updated, delta):
+            break
+        delta = updated
+    delta[start] = 0.0
+    return delta.reshape(runs, n), dist
+
+
+def rescale(betweenness, n, normalized=True):
+    # 无向图, 不计端点, 与 networkx 的缩放规则一致
+    if n - 1 < 2:
+        return betweenness
+    if normalized:
+        scale = 1 / ((n - 1) * (n - 2))
+    else:
+        scale = 0.5
+    return betweenness * scale
+
+
+def _share(array):
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    _SHARED.append(shm)
+    return shm.name, array.shape, array.dtype.str
+
+
+def _attach(specs):
+    global _GRAPH
+    arrays = []
+    for name, shape, dtype in specs:
+        shm = shared_memory.SharedMemory(name=name)
+        _SHARED.append(shm)
+        arrays.append(np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+    _GRAPH = tuple(arrays)
+
+
+def _worker_task(func, args):
+    return func(_GRAPH, *args)
+
+
+def split_sources(sources, num_chunks):
+    # 交错切分, 让高度数与低度数源点均匀分布到各块
+    num_chunks = max(1, min(num_chunks, len(sources)))
+    return [sources[i::num_chunks] for i in range(num_chunks)]
+
+
+def share_arrays(arrays):
+    # 把数组复制到共享内存, 返回可传给 attach_arrays 的描述; 用完后由创建方调用 release_shared
+    return [_share(a) for a in arrays]
+
+
+def attach_arrays(specs):
+    # 在子进程中按描述映射共享内存, 返回数组元组 (不复制)
+    _attach(specs)
+    return _GRAPH
+
+
+def release_shared(specs):
+    # 只释放本次创建的共享内存, 嵌套使用 (如流水线任务内部再调用 map_shared) 时互不影响
+    names = {name for name, _, _ in specs}
+    for shm in [shm for shm in _SHARED if shm.name in names]:
+        _SHARED.remove(shm)
+        shm.close()
+        shm.unlink()
+
+
+def map_shared(graph, func, tasks, workers=None):
+    # 在进程池中对每个任务执行 func(graph_arrays, *task), 图数组经共享内存只传一次;
+    # 按任务顺序产出结果, 调用方需取完全部结果以释放共享内存
+    specs = share_arrays((graph.indptr, graph.indices, graph.weights))
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(specs,)) as pool:
+            futures = [pool.submit(_worker_task, func, task) for task in tasks]
+            for future in futures:
+                yield future.result()
+    finally:
+        release_shared(specs)
+
+
+def run_sources(graph, sources, kernel, weighted=True, workers=None):
+    # 在进程池中按源点分块执行 kernel(graph_arrays, sources, n, weighted), 并把各块返回的数组相加
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(sources) < 2 * workers:
+        return kernel((graph.indptr, graph.indices, graph.weights), sources, graph.n, weighted)
+    tasks = [(chunk, graph.n, weighted) for chunk in split_sources(np.asarray(sources), workers * 4)]
+    total = None
+    for part in map_shared(graph, kernel, tasks, workers):
+        total = part if total is None else total + part
+    return total
+
+
+def parallel_betweenness(graph, sources, weighted=True, workers=None):
+    # graph 为 CSRGraph; 返回各源点依赖度之和 (未缩放)
+    return run_sources(graph, sources, betweenness_from_sources, weighted, workers)
+
+
+def betweenness_centrality(graph, weighted=True, normalized=True, workers=None):
+    # weighted=True 时以 Weight 作为距离, 对应 nx.betweenness_centrality(G, weight='Weight')
+    betweenness = parallel_betweenness(graph, np.arange(graph.n), weighted, workers)
+    return rescale(betweenness, graph.n, normalized)
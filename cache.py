@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from betweenness import parallel_betweenness, rescale
+
+# 指标结果的磁盘缓存: 以图内容哈希 + 指标参数为键, 总大小超限时按最近使用时间淘汰。
+# 多个进程可以同时读写同一目录: 写入先落到 .tmp 临时文件 (淘汰时跳过), 淘汰时条目可能已被其他进程删除
+
+TMP_SUFFIX = '.tmp'
+
+
+class MetricCache:
+    def __init__(self, directory='.sna_cache', max_bytes=512 * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, fingerprint, metric, params):
+        payload = json.dumps([fingerprint, metric, params or {}], sort_keys=True, default=str)
+        return os.path.join(self.directory, hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest())
+
+    def get(self, fingerprint, metric, params=None):
+        # 未命中返回 None; 数组条目存为 .npy, 多数组条目 (dict) 存为 .npz
+        base = self._path(fingerprint, metric, params)
+        for ext in ('.npy', '.npz'):
+            path = base + ext
+            try:
+                if ext == '.npy':
+                    value = np.load(path)
+                else:
+                    with np.load(path) as data:
+                        value = {name: data[name] for name in data.files}
+            except (FileNotFoundError, ValueError, OSError):
+                continue
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+            return value
+        return None
+
+    def put(self, fingerprint, metric, params, value):
+        ext = '.npz' if isinstance(value, dict) else '.npy'
+        path = self._path(fingerprint, metric, params) + ext
+        # 先写临时文件再原子替换, 并发运行时不会读到半个文件
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=ext + TMP_SUFFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if isinstance(value, dict):
+                    np.savez(f, **value)
+                else:
+                    np.save(f, np.asarray(value))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    def get_or_compute(self, graph, metric, params, compute):
+        value = self.get(graph.fingerprint(), metric, params)
+        if value is None:
+            value = compute()
+            self.put(graph.fingerprint(), metric, params, value)
+        return value
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(('.npy', '.npz')):
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(('.npy', '.npz')):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+
+def cached_betweenness(cache, graph, weighted=True, normalized=True, workers=None):
+    # 缓存未缩放的依赖度之和, 不同的归一化方式共用同一条缓存
+    if cache is None:
+        raw = parallel_betweenness(graph, np.arange(graph.n), weighted, workers)
+    else:
+        raw = cache.get_or_compute(graph, 'betweenness_raw', {'weighted': weighted},
+                                   lambda: parallel_betweenness(graph, np.arange(graph.n), weighted, workers))
+    return rescale(raw, graph.n, normalized)
+
+
+def cached_component_betweenness(cache, graph, nodes, weighted=True, normalized=True, workers=None):
+    # 连通分量内的最短路不经过分量外节点, 因此分量上的未缩放值就是整图值的切片
+    nodes = np.sort(np.asarray(nodes))
+    if len(nodes) == graph.n:
+        return cached_betweenness(cache, graph, weighted, normalized, workers)
+    whole = cache.get(graph.fingerprint(), 'betweenness_raw', {'weighted': weighted}) if cache else None
+    if whole is not None:
+        return rescale(whole[nodes], len(nodes), normalized)
+    return cached_betweenness(cache, graph.subgraph(nodes), weighted, normalized, workers)
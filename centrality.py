@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from csrgraph import CSRGraph
+from betweenness import single_source_dijkstra, single_source_bfs, accumulate, rescale, run_sources
+from profiling import profiled
+
+# 融合的中心性计算: 每个源点只做一次最短路, 同时累加中介中心性并得到该源点的接近中心性;
+# 特征向量中心性在同一 CSR 邻接矩阵上做稀疏幂迭代; PageRank 与个性化 PageRank 把多个种子的向量排成
+# n x b 的稠密块, 每轮只做一次 "稀疏转移矩阵 x 稠密块" 的乘法, 已收敛的列提前移出
+
+
+def fused_from_sources(graph, sources, n, weighted=True):
+    # 返回 2 x n 数组: 第 0 行为未缩放的中介依赖度之和, 第 1 行为各源点的接近中心性
+    sssp = single_source_dijkstra if weighted else single_source_bfs
+    result = np.zeros((2, n))
+    for s in sources:
+        s = int(s)
+        S, P, sigma, D = sssp(graph, s, n)
+        total = sum(D.values())
+        reach = len(D)
+        if total > 0 and n > 1:
+            # 与 networkx 的 wf_improved 规则一致: 按可达节点比例缩放
+            result[1, s] = (reach - 1) / total * (reach - 1) / (n - 1)
+        accumulate(result[0], S, P, sigma, s)
+    return result
+
+
+def eigenvector_centrality(graph, weighted=True, max_iter=100, tol=1e-06):
+    # 与 nx.eigenvector_centrality 相同的迭代: x <- (A + I) x, 按 2-范数归一化
+    n = graph.n
+    if n == 0:
+        raise ValueError("空图没有特征向量中心性")
+    A = graph.adjacency(weighted=weighted).astype(np.float64)
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        xlast = x
+        x = xlast + A @ xlast
+        norm = np.linalg.norm(x) or 1
+        x = x / norm
+        if np.abs(x - xlast).sum() < n * tol:
+            return x
+    raise RuntimeError(f"特征向量中心性在 {max_iter} 次迭代内未收敛")
+
+
+def transition_matrix(graph, weighted=True, dtype=np.float32):
+    # 返回 (W^T, 悬挂节点掩码), W 为按行归一化的转移矩阵 (自环计一次, 与 nx.pagerank 一致)
+    A = graph.adjacency(weighted=weighted).astype(np.float64)
+    strength = np.asarray(A.sum(axis=1)).ravel()
+    inverse = np.divide(1.0, strength, out=np.zeros(graph.n), where=strength > 0)
+    return (sp.diags(inverse) @ A).T.tocsr().astype(dtype), strength == 0
+
+
+def power_block(WT, dangling, teleport, alpha=0.85, max_iter=100, tol=1e-06):
+    # teleport 为 n x b 的跳转分布 (每列和为 1); 悬挂节点的质量按跳转分布重新分配, 与 nx.pagerank 的默认做法相同。
+    # 收敛判据与 networkx 一致: 每列两轮之间的 L1 变化小于 n * tol
+    n, b = teleport.shape
+    result = np.empty_like(teleport)
+    active = np.arange(b)
+    x = teleport.copy()
+    for _ in range(max_iter):
+        xlast = x
+        mass = alpha * xlast[dangling].sum(axis=0) + (1 - alpha)
+        x = alpha * (WT @ xlast) + teleport[:, active] * mass.astype(x.dtype)
+        done = np.abs(x - xlast).sum(axis=0) < n * tol
+        result[:, active[done]] = x[:, done]
+        active, x = active[~done], x[:, ~done]
+        if len(active) == 0:
+            return result
+    raise RuntimeError(f"PageRank 在 {max_iter} 次迭代内未收敛 ({len(active)} 个种子)")
+
+
+def pagerank(graph, alpha=0.85, weighted=True, max_iter=100, tol=1e-06):
+    # 全局 PageRank, 与 nx.pagerank(G, weight=...) 相同
+    if graph.n == 0:
+        return np.zeros(0)
+    WT, dangling = transition_matrix(graph, weighted, np.float64)
+    return power_block(WT, dangling, np.full((graph.n, 1), 1.0 / graph.n), alpha, max_iter, tol)[:, 0]
+
+
+def personalized_pagerank(graph, seeds, alpha=0.85, weighted=True, max_iter=100, tol=1e-06, dtype=np.float32,
+                          block_size=256, top_k=None):
+    # 以每个种子节点单独作为跳转目标的 PageRank, 种子按 block_size 个一组同时迭代。
+    # top_k 为 None 时返回 n x len(seeds) 矩阵 (第 j 列对应 seeds[j]);
+    # 否则返回 (节点编号, 得分) 两个 len(seeds) x top_k 数组, 按得分降序且不含种子本身
+    seeds = np.asarray(seeds, dtype=np.int64)
+    WT, dangling = transition_matrix(graph, weighted, dtype)
+    if top_k is None:
+        scores = np.empty((graph.n, len(seeds)), dtype=dtype)
+    else:
+        top_k = min(top_k, max(graph.n - 1, 0))
+        nodes = np.empty((len(seeds), top_k), dtype=np.int64)
+        scores = np.empty((len(seeds), top_k), dtype=dtype)
+    for start in range(0, len(seeds), block_size):
+        block = seeds[start:start + block_size]
+        teleport = np.zeros((graph.n, len(block)), dtype=dtype)
+        teleport[block, np.arange(len(block))] = 1
+        x = power_block(WT, dangling, teleport, alpha, max_iter, tol)
+        if top_k is None:
+            scores[:, start:start + len(block)] = x
+            continue
+        x[block, np.arange(len(block))] = -np.inf
+        x = x.T
+        best = np.argpartition(-x, top_k - 1, axis=1)[:, :top_k] if top_k else np.zeros((len(block), 0), int)
+        order = np.argsort(-np.take_along_axis(x, best, axis=1), axis=1, kind='stable')
+        nodes[start:start + len(block)] = np.take_along_axis(best, order, axis=1)
+        scores[start:start + len(block)] = np.take_along_axis(x, nodes[start:start + len(block)], axis=1)
+    return scores if top_k is None else (nodes, scores)
+
+
+@profiled
+def related_table(graph, seeds, top_k=10, **kwargs):
+    # "与作者 X 最相关的作者": 每个种子取个性化 PageRank 得分最高的 top_k 个节点, 长表格式便于导出
+    seeds = np.asarray(seeds, dtype=np.int64)
+    nodes, scores = personalized_pagerank(graph, seeds, top_k=top_k, **kwargs)
+    return pd.DataFrame({
+        'Author': np.repeat(graph.names[seeds], nodes.shape[1]),
+        'Rank': np.tile(np.arange(1, nodes.shape[1] + 1), len(seeds)),
+        'Related': graph.names[nodes.ravel()],
+        'Score': scores.ravel(),
+    })
+
+
+def fused_centrality(graph, weighted=True, normalized=True, max_iter=1000, workers=None):
+    # graph 为 CSRGraph; 返回 {指标名: 按节点编号排列的数组}
+    fused = run_sources(graph, np.arange(graph.n), fused_from_sources, weighted, workers)
+    return {
+        'Degree': graph.degree_centrality(),
+        'Degree (Weighted)': graph.weighted_degree(),
+        'Betweenness': rescale(fused[0], graph.n, normalized),
+        'Closeness': fused[1],
+        'Eigenvector': eigenvector_centrality(graph, weighted, max_iter=max_iter),
+    }
+
+
+@profiled
+def centrality_table(G, weight=None, weighted_degree=False, max_iter=1000, workers=None, cache=None):
+    # 对 networkx 图一次算出脚本里常用的四列中心性, 行索引为节点, 顺序与 G.nodes() 一致
+    # weight 同时作为中介/接近中心性的距离与特征向量中心性的权重, 与各脚本的 networkx 调用相同
+    # cache 为 MetricCache 时按图内容哈希复用上次的结果
+    graph = CSRGraph.from_networkx(G, weight or 'weight')
+    params = {'weight': weight, 'normalized': True, 'max_iter': max_iter}
+    compute = lambda: fused_centrality(graph, weighted=weight is not None, max_iter=max_iter, workers=workers)
+    scores = cache.get_or_compute(graph, 'fused_centrality', params, compute) if cache is not None else compute()
+    degree_column = 'Degree (Weighted)' if weighted_degree else 'Degree'
+    columns = [degree_column, 'Betweenness', 'Closeness', 'Eigenvector']
+    return pd.DataFrame({column: scores[column] for column in columns}, index=list(graph.names))
@@ -0,0 +1,226 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from betweenness import map_shared
+from csrgraph import CSRGraph
+from profiling import profiled
+from unionfind import component_labels
+
+# 多种子 Louvain 社区检测: 各种子在进程池中并发运行 (图数组经共享内存只传一次),
+# 再由边上的共同归属比例迭代得到共识划分, 并给出每次运行的模块度与稳定性
+
+PARTITION_COLUMNS = ('Modularity', 'ARI', 'NMI', 'Communities', 'Largest', 'Smallest', 'Mean Size', 'Singletons')
+EVALUATE_CELLS = 2 ** 24
+
+Consensus = namedtuple('Consensus', ['labels', 'runs', 'modularity', 'stability', 'agreement',
+                                     'consensus_modularity'])
+
+_NX_GRAPH = None
+
+
+def modularity(graph, labels, resolution=1.0, weighted=True):
+    # 与 nx.community.modularity 相同: sum_c [L_c / m - resolution * (D_c / 2m)^2]
+    source, target, weights = graph.edges()
+    weights = weights.astype(np.float64) if weighted else np.ones(len(source))
+    degree = graph.weighted_degree().astype(np.float64) if weighted else graph.degree().astype(np.float64)
+    m = degree.sum() / 2
+    if m == 0:
+        return 0.0
+    labels = np.asarray(labels)
+    inside = labels[source] == labels[target]
+    totals = np.bincount(labels, weights=degree)
+    return float(weights[inside].sum() / m - resolution * (totals ** 2).sum() / (4 * m * m))
+
+
+def dense_labels(label_matrix):
+    # 把 runs x n 的标签矩阵编码为全局连续的社区编号 (不同行的社区编号互不相同),
+    # 返回 (编号矩阵, 每个社区所属的行); 标签可以是任意可比较的值
+    label_matrix = np.asarray(label_matrix)
+    if label_matrix.ndim == 1:
+        label_matrix = label_matrix[np.newaxis]
+    runs, n = label_matrix.shape
+    values, codes = np.unique(label_matrix, return_inverse=True)
+    stride = max(len(values), 1)
+    keys = np.arange(runs, dtype=np.int64)[:, np.newaxis] * stride + codes.reshape(runs, n)
+    unique_keys, ids = np.unique(keys, return_inverse=True)
+    return ids.reshape(runs, n), unique_keys // stride
+
+
+def batch_modularity(graph, label_matrix, resolution=1.0, weighted=True):
+    # 一次计算多组划分的模块度; 按行分块, 每块只做一次 (块行数 x 边数) 的向量比较
+    ids, owner = dense_labels(label_matrix)
+    runs = ids.shape[0]
+    source, target, weights = graph.edges()
+    weights = weights.astype(np.float64) if weighted else np.ones(len(source))
+    degree = graph.weighted_degree().astype(np.float64) if weighted else graph.degree().astype(np.float64)
+    m = degree.sum() / 2
+    if m == 0:
+        return np.zeros(runs)
+    inside = np.zeros(runs)
+    step = max(EVALUATE_CELLS // max(len(source), 1), 1)
+    for start in range(0, runs, step):
+        block = ids[start:start + step]
+        inside[start:start + len(block)] = (block[:, source] == block[:, target]) @ weights
+    totals = np.bincount(ids.ravel(), weights=np.tile(degree, runs), minlength=len(owner))
+    expected = np.bincount(owner, weights=totals ** 2, minlength=runs)
+    return inside / m - resolution * expected / (4 * m * m)
+
+
+def batch_comparison(label_matrix, reference):
+    # 每组划分与参考划分的 ARI 与 NMI (算术平均归一化), 与 sklearn 的对应函数一致。
+    # 所有行的列联表由一次 (社区, 参考类别) 计数得到
+    ids, owner = dense_labels(label_matrix)
+    runs, n = ids.shape
+    _, truth = np.unique(np.asarray(reference), return_inverse=True)
+    classes = truth.max() + 1 if n else 0
+    cells, counts = np.unique(ids.astype(np.int64) * classes + truth, return_counts=True)
+    cell_run = owner[cells // classes]
+    counts = counts.astype(np.float64)
+    sizes = np.bincount(ids.ravel(), minlength=len(owner)).astype(np.float64)
+    truth_sizes = np.bincount(truth, minlength=classes).astype(np.float64)
+    # 成对混淆矩阵: tp 为两种划分都同组的有序点对数, 其余由边际和得到
+    sum_cells = np.bincount(cell_run, weights=counts ** 2, minlength=runs)
+    sum_sizes = np.bincount(owner, weights=sizes ** 2, minlength=runs)
+    sum_truth = (truth_sizes ** 2).sum()
+    tp = sum_cells - n
+    fp = sum_sizes - sum_cells
+    fn = sum_truth - sum_cells
+    tn = float(n) * n - fp - fn - sum_cells
+    denominator = (tp + fn) * (fn + tn) + (tp + fp) * (fp + tn)
+    perfect = (fn == 0) & (fp == 0)
+    ari = np.where(perfect, 1.0, 2.0 * (tp * tn - fn * fp) / np.where(denominator == 0, 1, denominator))
+    # 互信息与熵
+    if n == 0:
+        return ari, np.ones(runs)
+    mi_terms = counts / n * (np.log(counts) + np.log(n) - np.log(sizes[cells // classes]) -
+                             np.log(truth_sizes[cells % classes]))
+    mi = np.maximum(np.bincount(cell_run, weights=mi_terms, minlength=runs), 0)
+    p = sizes / n
+    entropy = -np.bincount(owner, weights=p * np.log(p), minlength=runs)
+    p = truth_sizes[truth_sizes > 0] / n
+    truth_entropy = -(p * np.log(p)).sum()
+    normalizer = np.maximum((entropy + truth_entropy) / 2, np.finfo(np.float64).eps)
+    nmi = np.where(mi == 0, 0.0, mi / normalizer)
+    single = (np.bincount(owner, minlength=runs) == 1) & (classes == 1)
+    return ari, np.where(single, 1.0, nmi)
+
+
+@profiled
+def evaluate_partitions(graph, label_matrix, reference=None, resolution=1.0, weighted=True):
+    # 返回每组划分一行的表: 模块度、与参考划分的 ARI / NMI (reference 为 None 时为 nan) 以及社区规模统计
+    ids, owner = dense_labels(label_matrix)
+    runs = ids.shape[0]
+    sizes = np.bincount(ids.ravel(), minlength=len(owner))
+    count = np.bincount(owner, minlength=runs)
+    first = np.cumsum(count) - count
+    table = pd.DataFrame({'Modularity': batch_modularity(graph, ids, resolution, weighted)})
+    if reference is None:
+        table['ARI'] = table['NMI'] = np.nan
+    else:
+        table['ARI'], table['NMI'] = batch_comparison(ids, reference)
+    # 同一行的社区编号连续, 可以用 reduceat 按行归约 (空图的各行没有社区)
+    table['Communities'] = count
+    table['Largest'] = np.maximum.reduceat(sizes, first) if len(sizes) else 0
+    table['Smallest'] = np.minimum.reduceat(sizes, first) if len(sizes) else 0
+    table['Mean Size'] = ids.shape[1] / np.maximum(count, 1)
+    table['Singletons'] = np.bincount(owner, weights=sizes == 1, minlength=runs).astype(np.int64)
+    return table[list(PARTITION_COLUMNS)]
+
+
+def labels_to_communities(labels, names=None):
+    # 标签向量 -> 社区集合列表 (按社区编号排列), 便于沿用 networkx 风格的绘图代码
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind='stable')
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    members = np.split(order, bounds)
+    return [set(names[group]) if names is not None else set(group.tolist()) for group in members]
+
+
+def relabel(labels):
+    # 按首次出现顺序重新编号为 0..k-1
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first)] = np.arange(len(first))
+    return rank[inverse]
+
+
+def louvain_labels(graph_arrays, seed, resolution=1.0, weighted=True):
+    # 在整数编号的 networkx 图上运行 Louvain; 进程内第一次调用时由共享的 CSR 数组建图并缓存,
+    # 缓存只在一次 louvain_runs 内有效 (进程池随调用结束, 主进程中由 louvain_runs 清除)
+    global _NX_GRAPH
+    import networkx as nx
+    indptr, indices, weights = graph_arrays
+    n = len(indptr) - 1
+    if _NX_GRAPH is None or _NX_GRAPH[0] is not graph_arrays:
+        rows = np.repeat(np.arange(n), np.diff(indptr))
+        keep = rows <= indices
+        G = nx.Graph()
+        G.add_nodes_from(range(n))
+        G.add_weighted_edges_from(zip(rows[keep].tolist(), indices[keep].tolist(), weights[keep].tolist()))
+        _NX_GRAPH = (graph_arrays, G)
+    G = _NX_GRAPH[1]
+    communities = nx.community.louvain_communities(G, weight='weight' if weighted else None,
+                                                   resolution=resolution, seed=int(seed))
+    labels = np.empty(n, dtype=np.int64)
+    for i, community in enumerate(communities):
+        labels[list(community)] = i
+    return labels
+
+
+def louvain_runs(graph, seeds, resolution=1.0, weighted=True, workers=None):
+    # 返回 runs x n 的标签矩阵, 第 k 行对应 seeds[k]
+    workers = workers or os.cpu_count() or 1
+    global _NX_GRAPH
+    arrays = (graph.indptr, graph.indices, graph.weights)
+    if workers == 1 or len(seeds) == 1:
+        try:
+            rows = [louvain_labels(arrays, seed, resolution, weighted) for seed in seeds]
+        finally:
+            _NX_GRAPH = None
+    else:
+        rows = list(map_shared(graph, louvain_labels, [(seed, resolution, weighted) for seed in seeds],
+                               min(workers, len(seeds))))
+    return np.vstack(rows) if rows else np.zeros((0, graph.n), dtype=np.int64)
+
+
+def co_assignment(source, target, runs):
+    # 每条边在多少比例的运行中两端被分到同一社区
+    agreement = np.zeros(len(source))
+    for labels in runs:
+        agreement += labels[source] == labels[target]
+    return agreement / max(len(runs), 1)
+
+
+def consensus_partition(graph, runs, threshold=0.5, resolution=1.0, max_rounds=5, workers=None, seed=0):
+    # Lancichinetti-Fortunato 共识聚类 (限制在原图的边上): 以共同归属比例为权、去掉低于 threshold 的边,
+    # 在该共识图上再跑同样数量的 Louvain (种子为 seed, seed+1, ...), 直到各次运行在每条边上都一致;
+    # 最后取比例不低于 threshold 的边连成的分量
+    source, target, _ = graph.edges()
+    agreement = co_assignment(source, target, runs)
+    for _ in range(max_rounds):
+        if np.all((agreement == 0) | (agreement == 1)):
+            break
+        keep = agreement >= threshold
+        consensus_graph = CSRGraph.from_edges(source[keep], target[keep], agreement[keep], graph.names)
+        runs = louvain_runs(consensus_graph, seed + np.arange(len(runs)), resolution, True, workers)
+        agreement = co_assignment(source, target, runs)
+    keep = agreement >= threshold
+    labels, _ = component_labels(graph.n, source[keep], target[keep])
+    return relabel(labels)
+
+
+@profiled
+def consensus_louvain(graph, runs=32, seed=42, resolution=1.0, threshold=0.5, weighted=True, workers=None):
+    # 种子为 seed, seed+1, ...; stability 为该次运行在各边上的同社区判断与全部运行多数意见一致的比例
+    label_runs = louvain_runs(graph, np.arange(seed, seed + runs), resolution, weighted, workers)
+    source, target, _ = graph.edges()
+    agreement = co_assignment(source, target, label_runs)
+    majority = agreement >= threshold
+    stability = np.array([np.mean((run[source] == run[target]) == majority) if len(source) else 1.0
+                          for run in label_runs])
+    scores = batch_modularity(graph, label_runs, resolution, weighted)
+    labels = consensus_partition(graph, label_runs, threshold, resolution, workers=workers, seed=seed)
+    return Consensus(labels, label_runs, scores, stability, agreement, modularity(graph, labels, resolution, weighted))
@@ -0,0 +1,146 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+from triangles import clustering_summary
+
+# 紧凑的无向图: 作者名映射为连续 int32 编号, 邻接表与 Weight 以 CSR 数组存储
+
+
+class CSRGraph:
+    def __init__(self, indptr, indices, weights, names, loops=None):
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.names = names
+        self.n = len(indptr) - 1
+        # 自环只在邻接表中出现一次, 度数按 networkx 的约定记 2
+        self.loops = loops if loops is not None else np.zeros(self.n, dtype=np.int32)
+        self.m = int((len(indices) + self.loops.sum()) // 2)
+        self._labels = None
+        self._fingerprint = None
+
+    @classmethod
+    def from_edges(cls, source, target, weights, names, labels=None):
+        # 边需唯一 (process.py 的输出已按作者对去重); 双向存储后按行排序
+        # labels 为边文件中预先算好的连通分量编号, 给出时不再遍历图
+        source = np.asarray(source, dtype=np.int32)
+        target = np.asarray(target, dtype=np.int32)
+        weights = np.asarray(weights)
+        if weights.dtype.kind not in 'iuf':
+            weights = weights.astype(np.float64)
+        n = len(names)
+        is_loop = source == target
+        rows = np.concatenate([source, target[~is_loop]])
+        cols = np.concatenate([target, source[~is_loop]])
+        vals = np.concatenate([weights, weights[~is_loop]])
+        order = np.lexsort((cols, rows))
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        loops = np.bincount(source[is_loop], minlength=n).astype(np.int32)
+        graph = cls(indptr, cols[order], vals[order], np.asarray(names, dtype=object), loops)
+        graph._labels = np.asarray(labels) if labels is not None else None
+        return graph
+
+    @classmethod
+    def from_networkx(cls, G, weight='weight'):
+        names = np.empty(G.number_of_nodes(), dtype=object)
+        for i, node in enumerate(G):
+            names[i] = node
+        index = {node: i for i, node in enumerate(names)}
+        edges = [(index[u], index[v], d.get(weight, 1)) for u, v, d in G.edges(data=True)]
+        source, target, weights = (np.array(col) for col in zip(*edges)) if edges else ([], [], [])
+        return cls.from_edges(source, target, weights, names)
+
+    def fingerprint(self):
+        # 图内容哈希 (CSR 为排序后的规范形式, 与边的输入顺序无关)
+        if self._fingerprint is None:
+            h = hashlib.blake2b(digest_size=16)
+            for array in (self.indptr, self.indices, self.weights, self.loops):
+                h.update(np.ascontiguousarray(array).tobytes())
+            h.update('\0'.join(map(str, self.names)).encode('utf-8'))
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def adjacency(self, weighted=True, loops=True):
+        data = self.weights if weighted else np.ones(len(self.indices))
+        A = sp.csr_matrix((data, self.indices, self.indptr), shape=(self.n, self.n), copy=not loops)
+        if not loops and self.loops.any():
+            A.setdiag(0)
+            A.eliminate_zeros()
+        return A
+
+    def edges(self):
+        # 每条无向边只返回一次 (u <= v)
+        rows = np.repeat(np.arange(self.n, dtype=np.int32), np.diff(self.indptr))
+        keep = rows <= self.indices
+        return rows[keep], self.indices[keep], self.weights[keep]
+
+    def degree(self):
+        return np.diff(self.indptr) + self.loops
+
+    def weighted_degree(self):
+        # 自环权重计两次, 与 G.degree(weight=...) 一致
+        rows = np.repeat(np.arange(self.n), np.diff(self.indptr))
+        loop_weights = np.where(rows == self.indices, self.weights, 0)
+        return np.bincount(rows, weights=self.weights + loop_weights, minlength=self.n).astype(self.weights.dtype)
+
+    def density(self):
+        if self.n <= 1:
+            return 0.0
+        return 2 * self.m / (self.n * (self.n - 1))
+
+    def component_labels(self):
+        if self._labels is None:
+            _, self._labels = connected_components(self.adjacency(weighted=False), directed=False)
+        return self._labels
+
+    def number_connected_components(self):
+        return int(self.component_labels().max()) + 1 if self.n else 0
+
+    def largest_component(self):
+        labels = self.component_labels()
+        return np.flatnonzero(labels == np.bincount(labels).argmax())
+
+    def degree_centrality(self):
+        if self.n <= 1:
+            return np.ones(self.n)
+        return self.degree() / (self.n - 1)
+
+    def clustering_summary(self, workers=None):
+        # 按度排序的三角形计数, 一次得到局部/平均聚类系数与传递性, 忽略自环与边权
+        return clustering_summary(self, workers)
+
+    def clustering(self):
+        return self.clustering_summary()['clustering']
+
+    def average_clustering(self):
+        return self.clustering_summary()['average_clustering']
+
+    def transitivity(self):
+        return self.clustering_summary()['transitivity']
+
+    def subgraph(self, nodes):
+        # nodes 为编号数组, 返回重新编号后的诱导子图
+        nodes = np.sort(np.asarray(nodes))
+        mapping = np.full(self.n, -1, dtype=np.int64)
+        mapping[nodes] = np.arange(len(nodes))
+        source, target, weights = self.edges()
+        keep = (mapping[source] >= 0) & (mapping[target] >= 0)
+        return CSRGraph.from_edges(mapping[source[keep]], mapping[target[keep]], weights[keep], self.names[nodes])
+
+    def to_networkx(self, weight='Weight'):
+        import networkx as nx
+        G = nx.Graph()
+        G.add_nodes_from(self.names)
+        source, target, weights = self.edges()
+        G.add_weighted_edges_from(zip(self.names[source], self.names[target], weights.tolist()), weight=weight)
+        return G
+
+    def top(self, scores, column, k=10):
+        # 只为前 k 名还原作者名
+        order = np.argsort(-np.asarray(scores), kind='stable')[:k]
+        return pd.DataFrame({'Author': self.names[order], column: np.asarray(scores)[order]})
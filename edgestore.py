@@ -0,0 +1,138 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from unionfind import component_labels, component_parent, component_table, grow_parent, union_edges
+
+# process.py 与 author.py 之间的二进制交接格式:
+# 一个目录, 内含整数编号的边数组 (.npy, 可内存映射) 和作者名字典 (UTF-8, 以 \0 分隔);
+# 写入时用并查集标出每位作者的连通分量编号与分量大小, 读取方无需再遍历图。
+# 增量模式 (incremental.py) 把每次新增的边和作者追加为 segments/ 下的一个段, meta.json 中的 segments
+# 为已提交的段数; 读取时各段依次接在基础文件之后
+
+FORMAT_VERSION = 1
+NAME_SEPARATOR = '\0'
+# 可选文件: 连通分量 (save_components) 与逐边年份 (temporal.save_temporal); 重写目录时先删除, 以免残留旧内容
+OPTIONAL_FILES = ('component.npy', 'component_size.npy', 'year.npy')
+SEGMENT_DIR = 'segments'
+
+
+def read_meta(path):
+    with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_meta(path, meta):
+    # 先写临时文件再替换, 读取方不会看到写了一半的 meta.json
+    temp = os.path.join(path, 'meta.json.tmp')
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(temp, os.path.join(path, 'meta.json'))
+
+
+def segment_paths(path, meta=None):
+    # 已提交的增量段目录, 按追加顺序
+    count = (meta if meta is not None else read_meta(path)).get('segments', 0)
+    return [os.path.join(path, SEGMENT_DIR, f'{i:04d}') for i in range(1, count + 1)]
+
+
+def save_edges(path, source, target, weights, names, components=True):
+    # components 为 True 时由边计算连通分量, 也可直接传入 (编号, 大小); False 时不写分量文件
+    os.makedirs(path, exist_ok=True)
+    for name in OPTIONAL_FILES:
+        try:
+            os.remove(os.path.join(path, name))
+        except FileNotFoundError:
+            pass
+    shutil.rmtree(os.path.join(path, SEGMENT_DIR), ignore_errors=True)
+    weights = np.asarray(weights)
+    weight_dtype = np.int32 if weights.dtype.kind in 'iu' and (weights.size == 0 or weights.max() < 2 ** 31) \
+        else weights.dtype
+    np.save(os.path.join(path, 'source.npy'), np.asarray(source, dtype=np.int32))
+    np.save(os.path.join(path, 'target.npy'), np.asarray(target, dtype=np.int32))
+    np.save(os.path.join(path, 'weight.npy'), weights.astype(weight_dtype))
+    with open(os.path.join(path, 'names.bin'), 'wb') as f:
+        f.write(NAME_SEPARATOR.join(str(name) for name in names).encode('utf-8'))
+    meta = {'version': FORMAT_VERSION, 'num_nodes': len(names), 'num_edges': int(len(weights))}
+    if components is True:
+        components = component_labels(len(names), source, target)
+    if components is not False:
+        labels, sizes = components
+        save_components(path, labels, sizes)
+        meta['num_components'] = int(labels.max()) + 1 if len(labels) else 0
+    write_meta(path, meta)
+
+
+def save_components(path, labels, sizes):
+    np.save(os.path.join(path, 'component.npy'), np.asarray(labels, dtype=np.int32))
+    np.save(os.path.join(path, 'component_size.npy'), np.asarray(sizes, dtype=np.int64))
+
+
+def load_components(path):
+    # 返回 (每位作者的连通分量编号, 所在分量大小); 旧版本边文件没有分量信息时返回 None。
+    # 分量文件只描述基础部分; 只有增量段中的新边可能连通原来不同的分量, 由并查集合并它们即可
+    try:
+        labels = np.load(os.path.join(path, 'component.npy'))
+        sizes = np.load(os.path.join(path, 'component_size.npy'))
+    except FileNotFoundError:
+        return None
+    meta = read_meta(path)
+    segments = segment_paths(path, meta)
+    if not segments:
+        return labels, sizes
+    parent = grow_parent(component_parent(labels), meta['num_nodes'])
+    for segment in segments:
+        union_edges(parent, np.load(os.path.join(segment, 'source.npy')), np.load(os.path.join(segment, 'target.npy')))
+    return component_table(parent)
+
+
+def load_names(path):
+    names = []
+    for part in [path, *segment_paths(path)]:
+        with open(os.path.join(part, 'names.bin'), 'rb') as f:
+            data = f.read().decode('utf-8')
+        names.extend(data.split(NAME_SEPARATOR) if data else [])
+    return np.array(names, dtype=object)
+
+
+def load_edges(path, mmap=True):
+    # 返回 (source, target, weight, names), 边数组默认以只读内存映射方式打开 (有增量段时拼接为内存数组)
+    meta = read_meta(path)
+    if meta.get('version') != FORMAT_VERSION:
+        raise ValueError(f"不支持的边文件版本: {meta.get('version')}")
+    mode = 'r' if mmap else None
+    parts = [path, *segment_paths(path, meta)]
+
+    def load(name):
+        arrays = [np.load(os.path.join(part, name), mmap_mode=mode) for part in parts]
+        return arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+
+    return load('source.npy'), load('target.npy'), load('weight.npy'), load_names(path)
+
+
+def frame_to_edges(df_edges):
+    # Source/Target/Weight 表 -> 整数编号边数组和作者名字典
+    codes, names = pd.factorize(pd.concat([df_edges['Source'], df_edges['Target']], ignore_index=True), sort=True)
+    m = len(df_edges)
+    return codes[:m].astype(np.int32), codes[m:].astype(np.int32), df_edges['Weight'].to_numpy(), \
+        np.asarray(names, dtype=object)
+
+
+def edges_to_frame(source, target, weights, names):
+    return pd.DataFrame({'Source': names[np.asarray(source)], 'Target': names[np.asarray(target)],
+                         'Weight': np.asarray(weights)})
+
+
+def save_edge_frame(path, df_edges):
+    save_edges(path, *frame_to_edges(df_edges))
+
+
+def load_edge_frame(path):
+    return edges_to_frame(*load_edges(path))
+
+
+def is_edge_store(path):
+    return os.path.isdir(path) and os.path.isfile(os.path.join(path, 'meta.json'))
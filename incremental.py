@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from ingest import AUTHOR_COLUMN, expand_inputs, iter_column_chunks
+from pairs import encode_authors, pair_counts, edge_keys
+from edgestore import FORMAT_VERSION, SEGMENT_DIR, save_edges, load_edges, load_names, load_components, \
+    is_edge_store, read_meta, write_meta, segment_paths
+from unionfind import union_edges, grow_parent, component_table, component_labels, component_parent
+
+# 增量预处理: 边文件目录同时作为计数状态, 额外保存已处理记录的键 (records.npy) 与边键索引 (keys.npy, 有序)。
+# 每次只读取新记录: 已有作者对的 Weight 在内存映射上原地累加, 新的边、作者与记录键追加为一个段
+# (edgestore 的 segments/), 写入量只与新数据有关; 本次变化的边另存为一个增量边文件 (Weight 为增量)
+# 供下游分析使用; 连通分量由并查集只合并新边得到。
+# 提交顺序: 写出新段 -> 写出重做日志 (journal.npz, 含原地修改后的权重值与新的 meta) -> 原地修改权重 ->
+# 替换 meta.json -> 删除日志。日志写出之前中断时新段未被引用, 下次运行丢弃; 之后中断时下次运行重做日志
+# (写入的是绝对值, 重复执行结果相同)。各段的边数超过基础部分或段数超过 MAX_SEGMENTS 时整体重写 (压缩),
+# 压缩先写入旁边的临时目录再整体换入, 摊还下来每次的写入量仍与新数据同阶
+
+KEY_COLUMNS = ('Title-题名', 'Author-作者', 'Source-文献来源')
+MAX_SEGMENTS = 64
+JOURNAL = 'journal.npz'
+
+
+def record_keys(frame, key_columns=KEY_COLUMNS):
+    # 各键列去空白后拼接, 取 64 位 blake2b 作为记录键
+    values = frame[list(key_columns)].fillna('').astype(str)
+    joined = values.apply(lambda column: column.str.strip()).agg('\x1f'.join, axis=1)
+    return np.array([int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+                     for text in joined], dtype=np.uint64)
+
+
+def store_parts(path, meta):
+    # 基础部分与各增量段的目录, 边键与记录键在每一部分内各自有序
+    return [path, *segment_paths(path, meta)]
+
+
+def load_part(part, name, mode='r'):
+    return np.load(os.path.join(part, name), mmap_mode=mode)
+
+
+def load_state(path, projection):
+    # 返回 (meta, 各部分目录, 各部分的边键, 各部分的记录键, names); 目录不存在时 meta 为 None, 各列表为空
+    if not is_edge_store(path):
+        return None, [], [], [], np.array([], dtype=object)
+    meta = read_meta(path)
+    if meta.get('version') != FORMAT_VERSION:
+        raise ValueError(f"不支持的边文件版本: {meta.get('version')}")
+    if 'incremental' not in meta:
+        raise ValueError(f"'{path}' 不是增量模式生成的边文件, 请先删除或换一个输出目录")
+    if meta['incremental']['projection'] != projection:
+        raise ValueError(f"投影参数与已有状态不一致: {meta['incremental']['projection']}")
+    parts = store_parts(path, meta)
+    return meta, parts, [load_part(part, 'keys.npy') for part in parts], \
+        [load_part(part, 'records.npy') for part in parts], load_names(path)
+
+
+def apply_journal(store):
+    # 重做日志: 把记录的权重值写入各部分的内存映射, 再提交日志中的 meta; 没有日志时什么也不做
+    path = os.path.join(store, JOURNAL)
+    if not os.path.isfile(path):
+        return
+    with np.load(path) as journal:
+        part, position, value = journal['part'], journal['position'], journal['value']
+        meta = json.loads(str(journal['meta']))
+    parts = store_parts(store, meta)
+    for i in np.unique(part):
+        weight = load_part(parts[i], 'weight.npy', 'r+')
+        weight[position[part == i]] = value[part == i]
+        weight.flush()
+        del weight
+    write_meta(store, meta)
+    os.remove(path)
+
+
+def recover_state(store):
+    # 处理上次中断的运行: 压缩在两次改名之间中断时旧状态仍完整保存在 .old 目录中;
+    # 日志已写出的追加由日志重做, 未提交的段直接删除
+    old = os.path.normpath(store) + '.old'
+    if not is_edge_store(store) and is_edge_store(old):
+        os.replace(old, store)
+    shutil.rmtree(old, ignore_errors=True)
+    shutil.rmtree(os.path.normpath(store) + '.tmp', ignore_errors=True)
+    if not is_edge_store(store):
+        return
+    apply_journal(store)
+    committed = set(segment_paths(store))
+    root = os.path.join(store, SEGMENT_DIR)
+    for name in os.listdir(root) if os.path.isdir(root) else []:
+        if os.path.join(root, name) not in committed:
+            shutil.rmtree(os.path.join(root, name))
+
+
+def commit_state(store, write):
+    # write(目录) 把完整的新状态写入临时目录, 再以两次改名换入; 任一时刻中断都保留完整的旧状态或新状态
+    staging, old = os.path.normpath(store) + '.tmp', os.path.normpath(store) + '.old'
+    shutil.rmtree(staging, ignore_errors=True)
+    write(staging)
+    if os.path.isdir(store):
+        os.replace(store, old)
+    os.replace(staging, store)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def find_sorted(sorted_parts, keys):
+    # 在各部分的有序键中查找 keys, 返回 (所在部分, 部分内位置), 找不到时部分为 -1
+    part = np.full(len(keys), -1, dtype=np.int64)
+    position = np.zeros(len(keys), dtype=np.int64)
+    for i, array in enumerate(sorted_parts):
+        if not len(array):
+            continue
+        at = np.minimum(np.searchsorted(array, keys), len(array) - 1)
+        hit = (part < 0) & (array[at] == keys)
+        part[hit], position[hit] = i, at[hit]
+    return part, position
+
+
+def new_records(paths, records, column=AUTHOR_COLUMN, key_columns=KEY_COLUMNS, chunk_size=50000):
+    # 产出尚未处理过的记录的作者列, 同时返回本次新增的记录键 (批内重复也只保留一条);
+    # records 为各部分的有序记录键
+    columns = list(dict.fromkeys([column, *key_columns]))
+    added = np.array([], dtype=np.uint64)
+    chunks = []
+    for path in expand_inputs(paths):
+        for chunk in iter_column_chunks(path, columns, chunk_size):
+            keys = record_keys(chunk, key_columns)
+            fresh = find_sorted(records, keys)[0] < 0
+            fresh &= ~pd.Series(keys).duplicated().to_numpy() & ~np.isin(keys, added)
+            added = np.union1d(added, keys[fresh])
+            chunks.append(chunk[column][fresh])
+    authors = pd.concat(chunks, ignore_index=True) if chunks else pd.Series([], dtype=object)
+    return authors, added
+
+
+def count_new_pairs(authors, names, separator=';', projection=None):
+    # 对新记录计数, 并把局部作者编码映射到全局字典 (新作者追加在末尾, 已有编号不变)
+    codes, offsets, local_names = encode_authors(authors, separator)
+    source, target, weights = pair_counts(codes, offsets, len(local_names), projection)
+    # 只有出现在作者对中的新作者进入字典, 与完整预处理一致 (独著作者不成为孤立节点)
+    mapping = pd.Index(names).get_indexer(local_names)
+    used = np.zeros(len(local_names), dtype=bool)
+    used[source] = used[target] = True
+    unknown = (mapping < 0) & used
+    mapping[unknown] = len(names) + np.arange(unknown.sum())
+    names = np.concatenate([names, local_names[unknown]]).astype(object)
+    source, target = mapping[source], mapping[target]
+    # 新作者编号在末尾, 编号顺序不等于名字顺序; 与完整预处理一致, 每条边按作者名排列 Source/Target
+    swap = names[source] > names[target]
+    return np.where(swap, target, source), np.where(swap, source, target), weights, names
+
+
+def ingest_incremental(paths, store='preprocess.edges', delta='preprocess.delta', column=AUTHOR_COLUMN,
+                       key_columns=KEY_COLUMNS, separator=';', chunk_size=50000, projection=None):
+    # 返回 (新记录数, 变化的边数, 新增的边数); 没有新记录时不改动状态, 增量边文件为空
+    projection = {key: value for key, value in (projection or {}).items() if value is not None}
+    if 'max_authors' not in projection:
+        projection.pop('oversize', None)
+    recover_state(store)
+    meta, parts, keys, records, names = load_state(store, projection)
+    authors, added = new_records(paths, records, column, key_columns, chunk_size)
+    components = load_components(store) if meta is not None else None
+    if components is None and len(names):
+        components = component_labels(len(names), *load_edges(store)[:2])
+    parent = component_parent(components[0]) if components is not None else np.array([], dtype=np.int64)
+    num_names = len(names)
+    new_source, new_target, increments, names = count_new_pairs(authors, names, separator, projection)
+    order = np.argsort(edge_keys(new_source, new_target))
+    new_source, new_target, increments = new_source[order], new_target[order], increments[order]
+    new_keys = edge_keys(new_source, new_target)
+    part, position = find_sorted(keys, new_keys)
+    inserted = part < 0
+    # 只有新边可能连通原来不同的分量
+    parent = union_edges(grow_parent(parent, len(names)), new_source[inserted], new_target[inserted])
+    components = component_table(parent)
+
+    # 增量边文件先于状态写出: 提交前中断时重新运行会得到同样的增量
+    save_edges(delta, new_source, new_target, increments, names, components=False)
+    write_meta(delta, dict(read_meta(delta), delta={'store': os.path.abspath(store), 'records': int(len(added)),
+                                                    'new_edges': int(inserted.sum())}))
+    if meta is not None and not len(added):
+        return 0, 0, 0
+
+    num_edges = int(sum(len(array) for array in keys)) + int(inserted.sum())
+    num_records = int(sum(len(array) for array in records)) + len(added)
+    new_meta = {'version': FORMAT_VERSION, 'num_nodes': len(names), 'num_edges': num_edges,
+                'num_components': int(components[0].max()) + 1 if len(names) else 0,
+                'incremental': {'projection': projection, 'records': num_records}}
+    weight_dtype = load_part(store, 'weight.npy').dtype if meta is not None else \
+        (np.float64 if projection.get('weighting') == 'fractional' else np.int32)
+    segment_edges = num_edges - len(keys[0]) if keys else num_edges
+    if meta is None or len(parts) > MAX_SEGMENTS or segment_edges > len(keys[0]):
+        # 首次运行或压缩: 合并全部部分与新边, 整体写入新的基础部分
+        source, target, weight, _ = load_edges(store, mmap=False) if meta is not None else \
+            (np.array([], dtype=np.int32), np.array([], dtype=np.int32), np.array([], dtype=weight_dtype), None)
+        found = np.flatnonzero(~inserted)
+        offsets = np.cumsum([0] + [len(array) for array in keys])
+        weight = weight.astype(weight_dtype, copy=False)
+        weight[offsets[part[found]] + position[found]] += increments[found].astype(weight_dtype)
+        all_keys = np.concatenate([*keys, new_keys[inserted]])
+        order = np.argsort(all_keys, kind='stable')
+        source = np.concatenate([source, new_source[inserted]])[order]
+        target = np.concatenate([target, new_target[inserted]])[order]
+        weight = np.concatenate([weight, increments[inserted].astype(weight_dtype)])[order]
+        all_records = np.union1d(np.concatenate([np.asarray(array) for array in records]) if records else added,
+                                 added)
+
+        def write(path):
+            save_edges(path, source, target, weight, names, components)
+            np.save(os.path.join(path, 'keys.npy'), all_keys[order])
+            np.save(os.path.join(path, 'records.npy'), all_records)
+            write_meta(path, new_meta)
+
+        commit_state(store, write)
+        return int(len(added)), int(len(new_keys)), int(inserted.sum())
+
+    # 追加: 新边、新作者与新记录键写成一个未提交的段, 已有边的新权重值记入日志后原地写入
+    new_meta['segments'] = len(parts)
+    segment = store_parts(store, new_meta)[-1]
+    shutil.rmtree(segment, ignore_errors=True)
+    save_edges(segment, new_source[inserted], new_target[inserted], increments[inserted].astype(weight_dtype),
+               names[num_names:], components=False)
+    np.save(os.path.join(segment, 'keys.npy'), new_keys[inserted])
+    np.save(os.path.join(segment, 'records.npy'), added)
+    found = np.flatnonzero(~inserted)
+    value = np.empty(len(found), dtype=weight_dtype)
+    for i in np.unique(part[found]):
+        hit = part[found] == i
+        value[hit] = load_part(parts[i], 'weight.npy')[position[found[hit]]] + \
+            increments[found[hit]].astype(weight_dtype)
+    temp = os.path.join(store, JOURNAL + '.tmp')
+    with open(temp, 'wb') as f:
+        np.savez(f, part=part[found], position=position[found], value=value, meta=json.dumps(new_meta))
+    os.replace(temp, os.path.join(store, JOURNAL))
+    apply_journal(store)
+    return int(len(added)), int(len(new_keys)), int(inserted.sum())
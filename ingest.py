@@ -0,0 +1,139 @@
+import errno
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from pairs import encode_authors, pair_counts, edge_keys, reduce_pair_keys, pairs_to_frame
+
+# 流式分块读取文献导出文件: 只读取作者列, 各文件在独立进程中计数, 最后归并
+
+AUTHOR_COLUMN = 'Author-作者'
+INPUT_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+
+def expand_inputs(paths):
+    # 支持文件、目录和通配符, 返回去重后的文件列表
+    if isinstance(paths, str):
+        paths = [paths]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            matched = sorted(os.path.join(path, f) for f in os.listdir(path)
+                             if f.lower().endswith(INPUT_EXTENSIONS) and not f.startswith('~$'))
+        elif os.path.isfile(path):
+            matched = [path]
+        else:
+            matched = sorted(glob.glob(path))
+        if not matched:
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+        files.extend(f for f in matched if f not in files)
+    return files
+
+
+def iter_column_chunks(path, columns, chunk_size=50000):
+    # 按块产出指定列组成的 DataFrame, 内存占用只与块大小有关
+    columns = list(columns)
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_size):
+            yield chunk[columns]
+    elif ext == '.xlsx':
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True)
+        try:
+            ws = wb.worksheets[0]
+            header = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+            for column in columns:
+                if column not in header:
+                    raise KeyError(column)
+            cols = [header.index(column) for column in columns]
+            lo, hi = min(cols), max(cols)
+            buffer = []
+            for row in ws.iter_rows(min_row=2, min_col=lo + 1, max_col=hi + 1, values_only=True):
+                buffer.append([row[col - lo] for col in cols])
+                if len(buffer) >= chunk_size:
+                    yield pd.DataFrame(buffer, columns=columns, dtype=object)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=columns, dtype=object)
+        finally:
+            wb.close()
+    else:
+        frame = pd.read_excel(path, usecols=columns)[columns]
+        for start in range(0, len(frame), chunk_size):
+            yield frame.iloc[start:start + chunk_size]
+
+
+def iter_author_chunks(path, column=AUTHOR_COLUMN, chunk_size=50000):
+    for chunk in iter_column_chunks(path, [column], chunk_size):
+        yield chunk[column]
+
+
+def empty_pair_counts():
+    return pd.DataFrame({'Source': pd.Series(dtype=object), 'Target': pd.Series(dtype=object),
+                         'Weight': pd.Series(dtype='int64')})
+
+
+def merge_pair_counts(left, right):
+    # 归并两份部分计数 (Source < Target 已在各自计数时标准化)
+    if left is None:
+        return right
+    merged = pd.concat([left, right], ignore_index=True)
+    return merged.groupby(['Source', 'Target'], sort=False, as_index=False)['Weight'].sum()
+
+
+def count_file(path, column=AUTHOR_COLUMN, separator=';', chunk_size=50000, projection=None):
+    # projection 为超边投影参数 (weighting / max_authors / oversize)。
+    # 各块的作者名映射到本文件统一的整数编号, 部分计数以 64 位边键累积; 待归并的部分计数达到已归并结果的
+    # 规模时才归并一次, 每条计数只被归并对数次, 内存与不同作者对数同阶
+    index, pending, waiting = {}, [], 0
+    keys, weights = np.array([], dtype=np.int64), None
+
+    def merge():
+        parts = pending if weights is None else [(keys, weights), *pending]
+        return reduce_pair_keys(np.concatenate([k for k, _ in parts]), np.concatenate([w for _, w in parts]))
+
+    for chunk in iter_author_chunks(path, column, chunk_size):
+        codes, offsets, local_names = encode_authors(chunk, separator)
+        source, target, counts = pair_counts(codes, offsets, len(local_names), projection)
+        mapping = np.fromiter((index.setdefault(name, len(index)) for name in local_names), dtype=np.int64,
+                              count=len(local_names))
+        pending.append((edge_keys(mapping[source], mapping[target]), counts))
+        waiting += len(counts)
+        if waiting >= len(keys):
+            keys, weights = merge()
+            pending, waiting = [], 0
+    if pending:
+        keys, weights = merge()
+    if weights is None:
+        return empty_pair_counts()
+    # 文件内编号按出现顺序分配, 换成按作者名排序的编号, 使 Source < Target 与整体计数一致
+    names = np.array(list(index), dtype=object)
+    order = np.argsort(names)
+    rank = np.empty(len(names), dtype=np.int64)
+    rank[order] = np.arange(len(names))
+    source, target = rank[keys >> 32], rank[keys & 0xFFFFFFFF]
+    return pairs_to_frame(np.minimum(source, target), np.maximum(source, target), weights, names[order], sort=False)
+
+
+def count_files(paths, column=AUTHOR_COLUMN, separator=';', chunk_size=50000, workers=None, projection=None):
+    # map: 每个文件一个进程计数; reduce: 按完成顺序归并部分计数
+    files = expand_inputs(paths)
+    counts = None
+    if workers == 1 or len(files) == 1:
+        for path in files:
+            counts = merge_pair_counts(counts, count_file(path, column, separator, chunk_size, projection))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(count_file, path, column, separator, chunk_size, projection) for path in files]
+            for future in as_completed(futures):
+                counts = merge_pair_counts(counts, future.result())
+    if counts is None:
+        counts = empty_pair_counts()
+    if (projection or {}).get('weighting') != 'fractional':
+        counts['Weight'] = counts['Weight'].astype('int64')
+    return counts.sort_values(by=['Weight', 'Source', 'Target'], ascending=[False, True, True],
+                              kind='stable').reset_index(drop=True)
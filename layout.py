@@ -0,0 +1,309 @@
+import zlib
+
+import numpy as np
+import scipy.sparse as sp
+
+from csrgraph import CSRGraph
+from profiling import profiled
+
+# 多层力导向布局: 重边匹配逐层粗化, 最粗层布局后逐层展开细化;
+# 斥力用向量化的 Barnes-Hut 四叉树近似, 引力沿 CSR 边计算, 内存按节点分块受控
+
+
+def coarsen(A, mass, rng):
+    # 每个节点向权重最大的邻居求配对, 互相选中的两点合并; 进展过慢时让未配对节点并入所选邻居
+    n = A.shape[0]
+    A = A.tocoo()
+    off_diag = A.row != A.col
+    rows, cols = A.row[off_diag], A.col[off_diag]
+    vals = A.data[off_diag] * (1 + 1e-6 * rng.random(off_diag.sum()))
+    proposal = np.arange(n)
+    if len(rows):
+        order = np.lexsort((-vals, rows))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = rows[order][1:] != rows[order][:-1]
+        proposal[rows[order][first]] = cols[order][first]
+    nodes = np.arange(n)
+    matched = (proposal[proposal] == nodes) & (proposal != nodes)
+    cluster = np.where(matched, np.minimum(nodes, proposal), nodes)
+    _, inverse = np.unique(cluster, return_inverse=True)
+    if inverse.max(initial=-1) + 1 > 0.9 * n:
+        attach = ~matched & (proposal != nodes)
+        cluster[attach] = cluster[proposal[attach]]
+        _, inverse = np.unique(cluster, return_inverse=True)
+    nc = inverse.max(initial=-1) + 1
+    P = sp.csr_matrix((np.ones(n), (nodes, inverse)), shape=(n, nc))
+    A_coarse = (P.T @ A.tocsr() @ P).tocsr()
+    return A_coarse, np.bincount(inverse, weights=mass, minlength=nc), inverse
+
+
+def choose_depth(pos, leaf_size=8, max_depth=20):
+    # 二分查找最浅的深度, 使每个叶子格子至多含 leaf_size 个节点 (离群点撑大包围盒时自动加深)
+    lo = pos.min(axis=0)
+    span = float((pos.max(axis=0) - lo).max()) or 1.0
+    unit = (pos - lo) / span
+
+    def max_occupancy(depth):
+        cells = 1 << depth
+        ixy = np.minimum((unit * cells).astype(np.int64), cells - 1)
+        return np.unique((ixy[:, 0] << depth) | ixy[:, 1], return_counts=True)[1].max()
+
+    low, high = 2, max_depth
+    while low < high:
+        mid = (low + high) // 2
+        if max_occupancy(mid) <= leaf_size:
+            high = mid
+        else:
+            low = mid + 1
+    return low
+
+
+def build_quadtree(pos, mass, depth):
+    # 按层记录非空格子的键、质量、质心、节点所属格子以及子格子列表; 键 = cx * 2^L + cy
+    lo = pos.min(axis=0)
+    span = float((pos.max(axis=0) - lo).max()) or 1.0
+    cells = 1 << depth
+    ixy = np.minimum(((pos - lo) / span * cells).astype(np.int64), cells - 1)
+    levels = []
+    for level in range(depth + 1):
+        shift = depth - level
+        keys = ((ixy[:, 0] >> shift) << level) | (ixy[:, 1] >> shift)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        cell_mass = np.bincount(inverse, weights=mass)
+        com = np.column_stack([np.bincount(inverse, weights=mass * pos[:, 0]),
+                               np.bincount(inverse, weights=mass * pos[:, 1])]) / cell_mass[:, None]
+        levels.append({'keys': unique_keys, 'mass': cell_mass, 'com': com, 'inverse': inverse})
+    for level in range(depth):
+        # 子格子按父格子分组, 以 CSR 形式保存
+        child_keys = levels[level + 1]['keys']
+        parent_keys = ((child_keys >> (level + 2)) << level) | ((child_keys & ((1 << (level + 1)) - 1)) >> 1)
+        parent = np.searchsorted(levels[level]['keys'], parent_keys)
+        order = np.argsort(parent, kind='stable')
+        counts = np.bincount(parent, minlength=len(levels[level]['keys']))
+        levels[level]['child_ptr'] = np.concatenate([[0], np.cumsum(counts)])
+        levels[level]['children'] = order
+    leaf = levels[depth]
+    leaf['node_order'] = np.argsort(leaf['inverse'], kind='stable')
+    leaf['node_ptr'] = np.concatenate([[0], np.cumsum(np.bincount(leaf['inverse'], minlength=len(leaf['keys'])))])
+    return levels, span
+
+
+def expand_pairs(first, second, ptr, members_a, ptr_b=None, members_b=None):
+    # 把 (a, b) 对展开成 a 的成员 x b 的成员的所有组合
+    if ptr_b is None:
+        ptr_b, members_b = ptr, members_a
+    count_a = ptr[first + 1] - ptr[first]
+    count_b = ptr_b[second + 1] - ptr_b[second]
+    total = count_a * count_b
+    pair = np.repeat(np.arange(len(first)), total)
+    offset = np.arange(total.sum()) - np.repeat(np.cumsum(total) - total, total)
+    nb = count_b[pair]
+    return members_a[ptr[first][pair] + offset // nb], members_b[ptr_b[second][pair] + offset % nb]
+
+
+def barnes_hut_repulsion(pos, mass, k, theta=0.6, leaf_size=8):
+    # 格子对格子的 Barnes-Hut: 同层的两个格子在 边长 < theta * 质心距离 时整体按质心相互作用,
+    # 否则同时展开两者的子格子; 最细层仍未分离的格子对逐点直接计算。
+    # 格子受到的斥力最后下推给格内所有节点, 每轮计算量与节点数近似成线性
+    n = len(pos)
+    levels, span = build_quadtree(pos, mass, choose_depth(pos, leaf_size))
+    depth = len(levels) - 1
+    fx = np.zeros(n)
+    fy = np.zeros(n)
+    kk = k * k
+    min_dist2 = (0.01 * k) ** 2
+    top = levels[1]
+    first, second = np.meshgrid(np.arange(len(top['keys'])), np.arange(len(top['keys'])), indexing='ij')
+    first, second = first.ravel(), second.ravel()
+    for level in range(1, depth + 1):
+        cells = levels[level]
+        cx, cy = cells['com'][:, 0], cells['com'][:, 1]
+        dx = cx[first] - cx[second]
+        dy = cy[first] - cy[second]
+        dist2 = np.maximum(dx * dx + dy * dy, min_dist2)
+        size = span / (1 << level)
+        separated = (first != second) & (size * size < theta * theta * dist2)
+        scale = np.where(separated, kk * cells['mass'][second] / dist2, 0)
+        num_cells = len(cells['keys'])
+        inverse = cells['inverse']
+        fx += np.bincount(first, weights=dx * scale, minlength=num_cells)[inverse]
+        fy += np.bincount(first, weights=dy * scale, minlength=num_cells)[inverse]
+        first, second = first[~separated], second[~separated]
+        if level == depth:
+            break
+        first, second = expand_pairs(first, second, cells['child_ptr'], cells['children'])
+    # 最细层: 相邻格子内的节点两两直接计算
+    leaf = levels[depth]
+    a, b = expand_pairs(first, second, leaf['node_ptr'], leaf['node_order'])
+    dx = pos[a, 0] - pos[b, 0]
+    dy = pos[a, 1] - pos[b, 1]
+    dist2 = np.maximum(dx * dx + dy * dy, min_dist2)
+    scale = np.where(a != b, kk * mass[b] / dist2, 0)
+    fx += np.bincount(a, weights=dx * scale, minlength=n)
+    fy += np.bincount(a, weights=dy * scale, minlength=n)
+    return np.column_stack([fx, fy])
+
+
+def spring_forces(pos, A, k):
+    # 引力 = 权重 * 距离 / k, 沿边指向邻居
+    A = A.tocoo()
+    delta = pos[A.row] - pos[A.col]
+    dist = np.sqrt((delta ** 2).sum(axis=1))
+    f = delta * (A.data * dist / k)[:, None]
+    n = len(pos)
+    return -np.column_stack([np.bincount(A.row, weights=f[:, 0], minlength=n),
+                             np.bincount(A.row, weights=f[:, 1], minlength=n)])
+
+
+def refine(pos, A, mass, iterations, temperature, theta=0.6, movable=None):
+    # Fruchterman-Reingold 迭代, 温度线性冷却, 与 nx.spring_layout 的步长规则一致
+    # movable 为布尔掩码时只移动这些节点, 其余节点保持原位
+    n = len(pos)
+    k = 1 / np.sqrt(n)
+    dt = temperature / (iterations + 1)
+    for _ in range(iterations):
+        displacement = barnes_hut_repulsion(pos, mass, k, theta) + spring_forces(pos, A, k)
+        if movable is not None:
+            displacement[~movable] = 0
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 0.01)
+        pos = pos + displacement * (temperature / length)[:, None]
+        temperature -= dt
+    return pos
+
+
+def rescale(pos, scale=1.0):
+    # 与 nx.rescale_layout 相同: 居中后把最大坐标缩放到 scale
+    pos = pos - pos.mean(axis=0)
+    lim = np.abs(pos).max()
+    return pos * (scale / lim) if lim > 0 else pos
+
+
+def multilevel_layout(graph, iterations=15, coarsest_iterations=100, min_size=50, theta=0.6,
+                      weighted=True, seed=42):
+    # graph 为 CSRGraph; 返回按节点编号排列的 n x 2 坐标数组
+    rng = np.random.default_rng(seed)
+    n = graph.n
+    if n <= 2:
+        return rescale(rng.random((n, 2))) if n else np.zeros((0, 2))
+    A = graph.adjacency(weighted=weighted, loops=False).astype(np.float64)
+    mass = np.ones(n)
+    hierarchy = [(A, mass, None)]
+    while hierarchy[-1][0].shape[0] > min_size and len(hierarchy) < 40:
+        A_coarse, mass_coarse, inverse = coarsen(hierarchy[-1][0], hierarchy[-1][1], rng)
+        if A_coarse.shape[0] > 0.95 * hierarchy[-1][0].shape[0] or A_coarse.shape[0] < 2:
+            break
+        hierarchy.append((A_coarse, mass_coarse, inverse))
+    A_top, mass_top, _ = hierarchy[-1]
+    pos = rng.random((A_top.shape[0], 2))
+    pos = refine(pos, A_top, mass_top, coarsest_iterations, 0.1, theta)
+    for level in range(len(hierarchy) - 1, 0, -1):
+        inverse = hierarchy[level][2]
+        A_fine, mass_fine, _ = hierarchy[level - 1]
+        k_fine = 1 / np.sqrt(A_fine.shape[0])
+        # 子节点继承父节点坐标并加小扰动, 再以较低温度细化
+        pos = pos[inverse] + rng.normal(scale=0.1 * k_fine, size=(len(inverse), 2))
+        pos = refine(pos, A_fine, mass_fine, iterations, 2 * k_fine, theta)
+    return rescale(pos)
+
+
+def refine_layout(graph, initial, movable=None, iterations=15, theta=0.6, weighted=True):
+    # 从已有坐标 (rescale 后的 [-1, 1] 范围) 出发细化, 不再重新缩放, 保持画面稳定
+    n = graph.n
+    if n <= 2:
+        return np.asarray(initial, dtype=float)
+    A = graph.adjacency(weighted=weighted, loops=False).astype(np.float64)
+    pos = np.asarray(initial, dtype=float) / 2
+    pos = refine(pos, A, np.ones(n), iterations, 2 / np.sqrt(n), theta, movable)
+    return pos * 2
+
+
+def node_signatures(graph):
+    # 每个节点的邻居集合与边权的哈希和, 用来判断哪些节点的连接发生了变化
+    name_hash = np.array([zlib.crc32(str(name).encode('utf-8')) for name in graph.names], dtype=np.uint64)
+    weights = np.asarray(graph.weights, dtype=np.float64).view(np.uint64)
+    values = name_hash[graph.indices] * np.uint64(1000003) + weights
+    signatures = np.zeros(graph.n, dtype=np.uint64)
+    nonempty = np.diff(graph.indptr) > 0
+    if values.size:
+        signatures[nonempty] = np.add.reduceat(values, graph.indptr[:-1][nonempty])
+    return signatures
+
+
+def warm_start(graph, previous, rng):
+    # 沿用旧布局中仍存在的节点坐标; 新节点放在已定位邻居的平均位置附近。
+    # 返回 (初始坐标, 需要重新细化的节点掩码): 新节点、连接变化的节点及其一阶邻居
+    names = np.array([str(name) for name in graph.names])
+    old_names = np.asarray(previous['names'])
+    order = np.argsort(old_names)
+    found = np.searchsorted(old_names[order], names)
+    found = np.minimum(found, len(old_names) - 1)
+    known = old_names[order][found] == names
+    old_index = order[found]
+    pos = np.zeros((graph.n, 2))
+    pos[known] = previous['pos'][old_index[known]]
+    changed = ~known
+    changed[known] = previous['signature'][old_index[known]] != node_signatures(graph)[known]
+    A = graph.adjacency(weighted=False, loops=False)
+    placed = known.copy()
+    for _ in range(3):
+        count = A @ placed.astype(float)
+        fill = ~placed & (count > 0)
+        if not fill.any():
+            break
+        pos[fill] = (A @ (pos * placed[:, None]))[fill] / count[fill, None]
+        placed |= fill
+    spread = 0.05 if known.any() else 1.0
+    pos[~known] += rng.normal(scale=spread, size=((~known).sum(), 2))
+    movable = changed | ((A @ changed.astype(float)) > 0)
+    return pos, movable
+
+
+def cached_layout(graph, cache=None, slot=None, params=None, full=None, warm=None, seed=42):
+    # 布局按图指纹缓存; slot 标识同一份数据的布局历史, 图变化时从上次的坐标热启动,
+    # 只细化受影响的节点。full(graph) 计算完整布局, warm(graph, 初始坐标, 可移动掩码) 做局部细化
+    full = full or (lambda g: multilevel_layout(g, seed=seed))
+    warm = warm or (lambda g, initial, movable: refine_layout(g, initial, movable))
+    if cache is None:
+        return full(graph)
+    params = dict(params or {}, seed=seed)
+    pos = cache.get(graph.fingerprint(), 'layout', params)
+    if pos is not None:
+        return pos
+    previous = cache.get(slot, 'layout_slot', params) if slot else None
+    if previous is not None and len(previous['names']):
+        initial, movable = warm_start(graph, previous, np.random.default_rng(seed))
+        pos = warm(graph, initial, movable) if movable.any() else initial
+    else:
+        pos = full(graph)
+    cache.put(graph.fingerprint(), 'layout', params, pos)
+    if slot:
+        cache.put(slot, 'layout_slot', params, {'names': np.array([str(name) for name in graph.names]),
+                                                'pos': pos, 'signature': node_signatures(graph)})
+    return pos
+
+
+@profiled
+def graph_layout(G, seed=42, small_graph_limit=2000, small_layout=None, weight='weight', cache=None, slot=None,
+                 **spring_kwargs):
+    # 小图沿用原来的 networkx 布局 (结果与之前完全一致), 大图改用多层 Barnes-Hut 布局;
+    # 传入 cache 时按图指纹复用布局, 图有变化则从 slot 中上次的坐标热启动
+    import networkx as nx
+    graph = CSRGraph.from_networkx(G, weight or 'weight')
+    if G.number_of_nodes() <= small_graph_limit:
+        def full(g):
+            pos = small_layout(G) if small_layout is not None else \
+                nx.spring_layout(G, seed=seed, weight=weight, **spring_kwargs)
+            return np.array([pos[node] for node in g.names])
+
+        def warm(g, initial, movable):
+            fixed = [node for node, move in zip(g.names, movable) if not move] or None
+            pos = nx.spring_layout(G, pos=dict(zip(g.names, initial)), fixed=fixed, seed=seed, weight=weight,
+                                   **spring_kwargs)
+            return np.array([pos[node] for node in g.names])
+    else:
+        full = lambda g: multilevel_layout(g, weighted=weight is not None, seed=seed)
+        warm = lambda g, initial, movable: refine_layout(g, initial, movable, weighted=weight is not None)
+    params = {'weight': weight, 'small_graph_limit': small_graph_limit, 'spring': sorted(spring_kwargs.items()),
+              'small_layout': getattr(small_layout, '__name__', None)}
+    pos = cached_layout(graph, cache, slot, params, full, warm, seed)
+    return dict(zip(graph.names, pos))
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# 合作作者对计数引擎: 作者名编码为整数, 用数组运算完成两两组合、标准化与计数;
+# 超边投影模式把论文-作者关联矩阵 B 投影为 B^T W B, 不展开每篇论文的两两组合
+
+
+def encode_authors(author_series, separator=';'):
+    # 拆分作者字符串, 返回 (作者编码, 每篇论文在编码数组中的起止偏移, 作者名表)
+    # 作者名按字典序编码, 因此编码大小关系与字符串大小关系一致
+    author_series = author_series.dropna().astype(str).reset_index(drop=True)
+    exploded = author_series.str.split(separator).explode().str.strip()
+    exploded = exploded[exploded.notna() & (exploded != '')]
+    codes, names = pd.factorize(exploded, sort=True)
+    counts = np.bincount(exploded.index.to_numpy(), minlength=len(author_series))
+    offsets = np.zeros(len(author_series) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return codes.astype(np.int32), offsets, np.asarray(names, dtype=object)
+
+
+def iter_pair_blocks(codes, offsets):
+    # 按论文作者数分组, 每组一次性生成所有两两组合 (较小编码在前)
+    sizes = np.diff(offsets)
+    for k in np.unique(sizes[sizes > 1]):
+        starts = offsets[:-1][sizes == k]
+        block = codes[starts[:, None] + np.arange(k)]
+        i, j = np.triu_indices(k, 1)
+        a, b = block[:, i].ravel(), block[:, j].ravel()
+        yield np.minimum(a, b), np.maximum(a, b)
+
+
+def count_pairs(codes, offsets, num_names):
+    # 把标准化后的作者对编码成一个 int64 键, 排序去重得到每对的合作次数
+    keys = [lo.astype(np.int64) * num_names + hi for lo, hi in iter_pair_blocks(codes, offsets)]
+    if not keys:
+        empty = np.array([], dtype=np.int32)
+        return empty, empty, np.array([], dtype=np.int64)
+    unique_keys, weights = np.unique(np.concatenate(keys), return_counts=True)
+    source = (unique_keys // num_names).astype(np.int32)
+    target = (unique_keys % num_names).astype(np.int32)
+    return source, target, weights
+
+
+WEIGHTINGS = ('count', 'fractional')
+OVERSIZE_MODES = ('truncate', 'drop', 'star')
+
+
+def project_hyperedges(codes, offsets, num_names, weighting='count', max_authors=None, oversize='truncate'):
+    # 每篇论文是一条超边: count 模式每对计 1, fractional 模式每对计 1/(k-1) (k 为作者数,
+    # 每位作者从一篇论文获得的总权重为 1)。返回值与 count_pairs 相同, count 模式结果与之一致
+    # 作者数超过 max_authors 的论文: truncate 只保留前 max_authors 位作者, drop 整篇跳过,
+    # star 只连接第一作者与其余作者 (k-1 对, 每对权重同上)
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"未知的权重方式: {weighting}, 可选 {WEIGHTINGS}")
+    if oversize not in OVERSIZE_MODES:
+        raise ValueError(f"未知的超大论文处理方式: {oversize}, 可选 {OVERSIZE_MODES}")
+    sizes = np.diff(offsets)
+    num_papers = len(sizes)
+    paper = np.repeat(np.arange(num_papers), sizes)
+    position = np.arange(len(codes)) - np.repeat(offsets[:-1], sizes)
+    star = np.zeros(num_papers, dtype=bool)
+    keep = np.ones(len(codes), dtype=bool)
+    if max_authors is not None:
+        oversized = sizes > max_authors
+        if oversize == 'truncate':
+            keep = ~oversized[paper] | (position < max_authors)
+        else:
+            keep = ~oversized[paper]
+            star = oversized if oversize == 'star' else star
+    # 超大论文按 star 处理时仍按原作者数计算 fractional 权重
+    kept_sizes = np.where(star, sizes, np.bincount(paper[keep], minlength=num_papers))
+    if weighting == 'count':
+        paper_weight = np.ones(num_papers, dtype=np.int32)
+    else:
+        paper_weight = np.divide(1.0, kept_sizes - 1, out=np.zeros(num_papers), where=kept_sizes > 1)
+    B = sp.csr_matrix((np.ones(keep.sum(), dtype=paper_weight.dtype), (paper[keep], codes[keep])),
+                      shape=(num_papers, num_names))
+    A = (B.T @ B.multiply(paper_weight[:, None]).tocsr()).tocsr()
+    # B 中同一论文重复出现的作者计为 c 次; 对角线 (同名自配对) 还原为 sum w * c(c-1)/2
+    diagonal = A.diagonal() - B.T @ paper_weight
+    A.setdiag(diagonal // 2 if weighting == 'count' else diagonal / 2)
+    upper = sp.triu(A, format='csr')
+    if star.any():
+        # 星形连接是线性的 (k-1 对), 直接列出后与投影结果相加
+        members = star[paper] & (position > 0)
+        lead = codes[offsets[:-1][paper[members]]]
+        other = codes[members]
+        upper = upper + sp.csr_matrix((paper_weight[paper[members]], (np.minimum(lead, other), np.maximum(lead, other))),
+                                      shape=(num_names, num_names))
+    upper.eliminate_zeros()
+    upper.sort_indices()
+    source = np.repeat(np.arange(num_names, dtype=np.int32), np.diff(upper.indptr))
+    weights = upper.data.astype(np.int64) if weighting == 'count' else upper.data
+    return source, upper.indices.astype(np.int32), weights
+
+
+def pair_counts(codes, offsets, num_names, projection=None):
+    # projection 为超边投影参数 (weighting / max_authors / oversize), 都未指定时沿用两两组合计数
+    projection = projection or {}
+    if projection.get('weighting') is None and projection.get('max_authors') is None:
+        return count_pairs(codes, offsets, num_names)
+    return project_hyperedges(codes, offsets, num_names, projection.get('weighting') or 'count',
+                              projection.get('max_authors'), projection.get('oversize') or 'truncate')
+
+
+def edge_keys(source, target):
+    # 与方向无关的边键: 较小编号在高位, 因此按名字排列的 Source/Target 也能查到同一条边
+    source, target = np.asarray(source, dtype=np.int64), np.asarray(target, dtype=np.int64)
+    return (np.minimum(source, target) << 32) | np.maximum(source, target)
+
+
+def reduce_pair_keys(keys, weights):
+    # 合并同一边键的部分计数, 返回按键排序的 (键, 权重); 整数权重保持原类型
+    unique, inverse = np.unique(keys, return_inverse=True)
+    total = np.bincount(inverse, weights=weights, minlength=len(unique))
+    return unique, total.astype(weights.dtype) if weights.dtype.kind in 'iu' else total
+
+
+def pairs_to_frame(source, target, weights, names, sort=True):
+    # 还原作者名, 按合作次数降序排列 (同次数按作者名排序)
+    df = pd.DataFrame({'Source': names[source], 'Target': names[target], 'Weight': weights})
+    if not sort:
+        return df
+    return df.sort_values(by='Weight', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def weighted_edges(author_series, separator=';', sort=True, weighting=None, max_authors=None, oversize='truncate'):
+    # weighting 为 None 时沿用两两组合计数; 指定 'count' / 'fractional' 时用超边投影
+    codes, offsets, names = encode_authors(author_series, separator)
+    projection = {'weighting': weighting, 'max_authors': max_authors, 'oversize': oversize}
+    source, target, weights = pair_counts(codes, offsets, len(names), projection)
+    return pairs_to_frame(source, target, weights, names, sort=sort)
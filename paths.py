@@ -0,0 +1,161 @@
+from heapq import heappush, heappop
+from itertools import count
+
+import numpy as np
+import pandas as pd
+from scipy.sparse.csgraph import dijkstra
+
+from profiling import stage
+
+# 最短路查询索引 (ALT: A*, Landmarks, Triangle inequality):
+# 在最大连通分量中按 "最远点" 选取少量地标, 预先算出地标到所有节点的距离 (内存为 地标数 x 节点数 个 float64)。
+# 由三角不等式 |d(l, u) - d(l, v)| <= d(u, v) <= d(l, u) + d(l, v) 得到任意两点距离的上下界:
+# 单次查询用下界作为 A* 的启发函数 (结果精确), 批量查询先用上下界直接确定一部分, 其余按源点分组做带上限的 Dijkstra
+
+
+class PathIndex:
+    def __init__(self, graph, landmarks=16, weighted=True):
+        # weighted=True 时以 Weight 作为距离, 与中介/接近中心性的定义一致; 否则按跳数计算
+        self.graph = graph
+        self.weighted = weighted
+        self.lookup = pd.Index(graph.names)
+        self.labels = graph.component_labels()
+        self.matrix = graph.adjacency(weighted=weighted, loops=False).astype(np.float64)
+        self.weights = self.matrix.data
+        with stage('path_index', graph, landmarks=landmarks):
+            self.landmarks, self.table = select_landmarks(self.matrix, graph, landmarks)
+        # 只有与地标同一分量的节点才有有效的界, 其他 (很小的) 分量退化为普通 Dijkstra
+        self.covered = self.labels == self.labels[self.landmarks[0]] if len(self.landmarks) else \
+            np.zeros(graph.n, dtype=bool)
+
+    def nodes(self, names):
+        index = self.lookup.get_indexer(list(names))
+        if (index < 0).any():
+            missing = [name for name, i in zip(names, index) if i < 0]
+            raise KeyError(f"作者不在网络中: {missing[:5]}")
+        return index
+
+    def bounds(self, source, target):
+        # 每对节点距离的 (下界, 上界); 不同分量为 (inf, inf), 无地标覆盖时为 (0, inf)
+        source, target = np.asarray(source), np.asarray(target)
+        lower = np.zeros(len(source))
+        upper = np.full(len(source), np.inf)
+        both = self.covered[source] & self.covered[target]
+        if both.any():
+            ds, dt = self.table[source[both]], self.table[target[both]]
+            lower[both] = np.abs(ds - dt).max(axis=1)
+            upper[both] = (ds + dt).min(axis=1)
+        apart = self.labels[source] != self.labels[target]
+        lower[apart] = upper[apart] = np.inf
+        same = source == target
+        lower[same] = upper[same] = 0.0
+        return lower, upper
+
+    def search(self, s, t):
+        # 以地标下界为启发函数的 A*, 返回 (距离, 节点编号路径); 不连通时为 (inf, [])
+        if self.labels[s] != self.labels[t]:
+            return np.inf, []
+        indptr, indices, weights = self.matrix.indptr, self.matrix.indices, self.weights
+        guided = self.covered[s]
+        target_row = self.table[t] if guided else None
+        best = {s: 0.0}
+        parent = {s: -1}
+        done = set()
+        c = count()
+        Q = [(0.0, next(c), s)]
+        while Q:
+            _, _, v = heappop(Q)
+            if v in done:
+                continue
+            if v == t:
+                break
+            done.add(v)
+            start, stop = indptr[v], indptr[v + 1]
+            nbrs = indices[start:stop]
+            dist = best[v] + weights[start:stop]
+            heuristic = np.abs(self.table[nbrs] - target_row).max(axis=1) if guided else np.zeros(len(nbrs))
+            for w, d, h in zip(nbrs.tolist(), dist.tolist(), heuristic.tolist()):
+                if w not in done and d < best.get(w, np.inf):
+                    best[w] = d
+                    parent[w] = v
+                    heappush(Q, (d + h, next(c), w))
+        path = [t]
+        while parent[path[-1]] >= 0:
+            path.append(parent[path[-1]])
+        return best[t], path[::-1]
+
+    def distance(self, u, v):
+        s, t = self.nodes([u, v])
+        lower, upper = self.bounds([s], [t])
+        if lower[0] == upper[0]:
+            return float(lower[0])
+        return float(self.search(s, t)[0])
+
+    def path(self, u, v):
+        # 返回作者名列表; 不连通时为空列表
+        s, t = self.nodes([u, v])
+        return self.graph.names[self.search(s, t)[1]].tolist()
+
+    def distances(self, sources, targets):
+        # 批量距离查询: 上下界相等的直接得到, 其余按源点分组, 每组一次 Dijkstra (以组内最大上界为搜索半径)
+        source, target = self.nodes(sources), self.nodes(targets)
+        lower, upper = self.bounds(source, target)
+        result = np.where(lower == upper, lower, np.nan)
+        for s, rows in pending_groups(source, result):
+            row = dijkstra(self.matrix, indices=s, limit=search_limit(upper[rows]))
+            result[rows] = row[target[rows]]
+        return result
+
+    def paths(self, sources, targets):
+        # 批量路径查询, 按源点分组共用一次 Dijkstra 的前驱数组
+        source, target = self.nodes(sources), self.nodes(targets)
+        lower, upper = self.bounds(source, target)
+        result = [[] for _ in range(len(source))]
+        unresolved = np.where(np.isinf(lower), np.inf, np.nan)
+        for s, rows in pending_groups(source, unresolved):
+            _, predecessors = dijkstra(self.matrix, indices=s, limit=search_limit(upper[rows]),
+                                       return_predecessors=True)
+            for i in rows:
+                node = target[i]
+                walk = [node]
+                while node != s:
+                    node = predecessors[node]
+                    walk.append(node)
+                result[i] = self.graph.names[walk[::-1]].tolist()
+        return result
+
+
+def search_limit(upper):
+    # 组内最大上界, 略放宽以免浮点求和顺序不同导致恰好等于上界的目标被截掉
+    return upper.max() * (1 + 1e-9)
+
+
+def pending_groups(source, result):
+    # 产出 (源点, 该源点下结果仍为 nan 的查询行号)
+    pending = np.flatnonzero(np.isnan(result))
+    order = pending[np.argsort(source[pending], kind='stable')]
+    if len(order) == 0:
+        return
+    bounds = np.flatnonzero(np.diff(source[order])) + 1
+    for rows in np.split(order, bounds):
+        yield int(source[rows[0]]), rows
+
+
+def select_landmarks(matrix, graph, k):
+    # 最远点策略: 从最大分量中度数最高的节点出发, 每次取到已选地标最近距离最大的节点
+    if graph.n == 0 or k <= 0:
+        return np.array([], dtype=np.int64), np.zeros((graph.n, 0))
+    members = graph.largest_component()
+    degree = graph.degree()
+    chosen = [int(members[np.argmax(degree[members])])]
+    rows = [dijkstra(matrix, indices=chosen[0])]
+    nearest = rows[0].copy()
+    while len(chosen) < min(k, len(members)):
+        candidate = int(members[np.argmax(nearest[members])])
+        if nearest[candidate] == 0:
+            break
+        chosen.append(candidate)
+        rows.append(dijkstra(matrix, indices=candidate))
+        nearest = np.minimum(nearest, rows[-1])
+    # 按节点存放 (n x k), 单个节点的各地标距离在内存中连续
+    return np.array(chosen, dtype=np.int64), np.ascontiguousarray(np.vstack(rows).T)
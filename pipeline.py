@@ -0,0 +1,186 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+from betweenness import share_arrays, attach_arrays, release_shared, betweenness_from_sources, rescale, \
+    split_sources
+from csrgraph import CSRGraph
+from profiling import active, stage, timed_call
+
+# 指标流水线: 每个指标 (以及布局) 是依赖图中的一个任务, 依赖满足的任务立即提交到进程池并发执行。
+# 进程池的每个子进程由共享内存中的同一份 CSR 数组重建图 (不复制), 任务完成后按完成顺序回调,
+# 调用方可以边算边输出结果; local=True 的任务 (合并、查缓存等轻量步骤) 在主进程中执行。
+# 开启阶段记录时每个任务记为一个阶段, 子进程中的任务 (及其内部的 stage / @profiled 阶段) 由子进程测量后交回主进程登记
+
+Task = namedtuple('Task', ['name', 'func', 'args', 'deps', 'local'])
+Task.__new__.__defaults__ = ((), (), False)
+
+_WORKER_GRAPH = None
+
+
+class DependencyError(RuntimeError):
+    pass
+
+
+def _attach_graph(specs, names, fingerprint):
+    global _WORKER_GRAPH
+    indptr, indices, weights, loops, labels = attach_arrays(specs)
+    _WORKER_GRAPH = CSRGraph(indptr, indices, weights, names, loops)
+    _WORKER_GRAPH._labels = labels
+    _WORKER_GRAPH._fingerprint = fingerprint
+
+
+def _run_task(func, args, inputs, profiled=False):
+    if profiled:
+        return timed_call(func, _WORKER_GRAPH, *args, *inputs)
+    return func(_WORKER_GRAPH, *args, *inputs)
+
+
+def run_tasks(graph, tasks, workers=None, on_result=None):
+    # 执行 func(graph, *args, *依赖任务的结果), 返回 {任务名: 结果}。
+    # on_result(name, value, error) 在每个任务结束时于主进程中调用; 任务出错时 error 为异常,
+    # 依赖它的任务不再执行, 同样以 DependencyError 回调。workers=1 时按给定顺序在本进程中依次执行
+    workers = workers or os.cpu_count() or 1
+    names = [task.name for task in tasks]
+    if len(set(names)) != len(names):
+        raise ValueError("任务名重复")
+    unknown = {dep for task in tasks for dep in task.deps} - set(names)
+    if unknown:
+        raise ValueError(f"未定义的依赖任务: {sorted(unknown)}")
+    results, errors = {}, {}
+
+    def finish(task, value=None, error=None):
+        if error is None:
+            results[task.name] = value
+        else:
+            errors[task.name] = error
+        if on_result is not None:
+            on_result(task.name, value, error)
+
+    def execute(task, run):
+        failed = [dep for dep in task.deps if dep in errors]
+        if failed:
+            finish(task, error=DependencyError(f"依赖的任务 {failed[0]} 失败: {errors[failed[0]]}"))
+            return
+        try:
+            value = run(task)
+        except Exception as e:
+            finish(task, error=e)
+        else:
+            finish(task, value)
+
+    inputs = lambda task: [results[dep] for dep in task.deps]
+    profiler = active()
+
+    def local_run(task):
+        with stage(task.name, graph):
+            return task.func(graph, *task.args, *inputs(task))
+
+    def collect(task, result):
+        if profiler is None:
+            return result
+        value, records = result
+        profiler.add_remote(records, stage=task.name, nodes=graph.n, edges=graph.m)
+        return value
+
+    if workers == 1 or all(task.local for task in tasks):
+        for task in topological_order(tasks):
+            execute(task, local_run)
+        return results
+
+    arrays = (graph.indptr, graph.indices, graph.weights, graph.loops, graph.component_labels())
+    specs = share_arrays(arrays)
+    waiting = list(tasks)
+    running = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_graph,
+                                 initargs=(specs, graph.names, graph.fingerprint())) as pool:
+            while waiting or running:
+                settled = set(results) | set(errors)
+                ready = [task for task in waiting if all(dep in settled for dep in task.deps)]
+                waiting = [task for task in waiting if task not in ready]
+                for task in ready:
+                    if task.local or any(dep in errors for dep in task.deps):
+                        execute(task, local_run)
+                    else:
+                        running[pool.submit(_run_task, task.func, task.args, inputs(task),
+                                            profiler is not None)] = task
+                if ready and any(task.local for task in ready):
+                    # 本地任务完成后可能有新任务就绪, 先回到循环开头提交
+                    continue
+                if not running:
+                    if waiting:
+                        raise ValueError(f"任务存在循环依赖: {[task.name for task in waiting]}")
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    execute(task, lambda task: collect(task, future.result()))
+    finally:
+        release_shared(specs)
+    return results
+
+
+def select_tasks(tasks, names):
+    # 只保留 names 中的任务及其 (递归的) 依赖, 顺序不变; 不存在的名称忽略
+    by_name = {task.name: task for task in tasks}
+    needed, stack = set(), [name for name in names if name in by_name]
+    while stack:
+        name = stack.pop()
+        if name not in needed:
+            needed.add(name)
+            stack.extend(by_name[name].deps)
+    return [task for task in tasks if task.name in needed]
+
+
+def topological_order(tasks):
+    # 保持给定顺序的拓扑排序
+    order, placed, remaining = [], set(), list(tasks)
+    while remaining:
+        ready = [task for task in remaining if all(dep in placed for dep in task.deps)]
+        if not ready:
+            raise ValueError(f"任务存在循环依赖: {[task.name for task in remaining]}")
+        order.append(ready[0])
+        placed.add(ready[0].name)
+        remaining.remove(ready[0])
+    return order
+
+
+def cached_call(graph, cache, metric, params, func, *args):
+    # 任务形式的 cache.get_or_compute: 命中时直接返回, 否则计算 func(graph, *args) 并写入缓存
+    compute = lambda: func(graph, *args)
+    return cache.get_or_compute(graph, metric, params, compute) if cache is not None else compute()
+
+
+def betweenness_chunk(graph, sources, weighted=True):
+    return betweenness_from_sources((graph.indptr, graph.indices, graph.weights), sources, graph.n, weighted)
+
+
+def betweenness_tasks(name, graph, nodes=None, weighted=True, normalized=True, cache=None, chunks=1):
+    # 中介中心性拆成按源点分块的任务和一个主进程中的合并任务, 与其他指标共用同一个进程池。
+    # nodes 为连通分量时只从分量内的源点出发 (分量内最短路不经过分量外节点), 结果即分量子图上的值;
+    # 缓存键与 cached_betweenness / cached_component_betweenness 相同
+    whole = nodes is None or len(nodes) == graph.n
+    nodes = np.arange(graph.n) if whole else np.sort(np.asarray(nodes))
+    params = {'weighted': weighted}
+    raw = cache.get(graph.fingerprint(), 'betweenness_raw', params) if cache is not None else None
+    if raw is not None:
+        raw = raw[nodes]
+    target = graph if whole else graph.subgraph(nodes)
+    if raw is None and cache is not None and not whole:
+        raw = cache.get(target.fingerprint(), 'betweenness_raw', params)
+    if raw is not None:
+        return [Task(name, lambda graph: rescale(raw, len(nodes), normalized), local=True)]
+
+    parts = [Task(f'{name}:{i}', betweenness_chunk, (chunk, weighted))
+             for i, chunk in enumerate(split_sources(nodes, chunks))]
+
+    def combine(graph, *partials):
+        total = sum(partials)[nodes]
+        if cache is not None:
+            cache.put(target.fingerprint(), 'betweenness_raw', params, total)
+        return rescale(total, len(nodes), normalized)
+
+    return parts + [Task(name, combine, deps=tuple(part.name for part in parts), local=True)]
@@ -1,38 +1,104 @@
+import argparse
+import os
 import pandas as pd
-import itertools
 import re
+from pairs import weighted_edges, pairs_to_frame, WEIGHTINGS, OVERSIZE_MODES
+from ingest import count_files
+from edgestore import save_edge_frame, load_edge_frame
+from incremental import ingest_incremental
+from temporal import read_yearly_pairs, collapse_years, save_temporal, YEAR_COLUMN
+import profiling
+from profiling import stage
 file_name = "管理科学.xlsx "
-try:
-    df = pd.read_excel(file_name)
-
-    #处理作者数据
-    author_series = df['Author-作者'].dropna()
-    edge_list = []
-    separator = ';'
-
-    for author_string in author_series:
-        authors = author_string.split(separator)
-        cleaned_authors = [name.strip() for name in authors if name.strip()]
-        if len(cleaned_authors) > 1:
-            # 获取所有唯一的两两组合
-            pairs = list(itertools.combinations(cleaned_authors, 2))
-            edge_list.extend(pairs)
-    if not edge_list:
-        df_weighted_edges = pd.DataFrame(columns=['Source', 'Target', 'Weight'])
-    else:
-        df_edges = pd.DataFrame(edge_list, columns=['Author1', 'Author2'])
-        # 标准化和聚合
-        standardized_pairs = df_edges.apply(lambda x: tuple(sorted(x)), axis=1)
-        df_standardized = pd.DataFrame(standardized_pairs.tolist(), columns=['Source', 'Target'])
-        df_weighted_edges = df_standardized.groupby(['Source', 'Target']).size().reset_index(name='Weight')
-        # 按次数降序排列
-        df_weighted_edges = df_weighted_edges.sort_values(by='Weight', ascending=False)
-        print("合作最紧密的前10对作者:")
-        print(df_weighted_edges.head(10))
-    output_filename = "preprocess.xlsx"
-    df_weighted_edges.to_excel(output_filename, index=False)
-
-except FileNotFoundError:
-    print(f"错误：文件 '{file_name}' 未找到。")
-except Exception as e:
-    print(f"处理过程中发生错误: {e}")
\ No newline at end of file
+
+
+def main(input_paths, export_excel=False, projection=None, incremental=False, output='preprocess.edges',
+         delta='preprocess.delta', temporal=False, year_column=YEAR_COLUMN):
+    # 传入文件、目录或通配符时, 使用流式分块读取并多进程计数
+    # projection 指定超边投影方式 (weighting / max_authors / oversize), 大型合作论文不再展开全部作者对
+    # incremental 时在已有的 output 上只累加新记录, 变化的边写入 delta
+    # temporal 时按 year_column 的发表年份分别计数, output 中每条边带年份, 供 temporal.py 做时间切片分析
+    if incremental and temporal:
+        print("错误：增量模式与按年份计数不能同时使用。")
+        return
+    try:
+        if temporal:
+            with stage('count_years'):
+                year, source, target, weights, names, skipped = read_yearly_pairs(
+                    input_paths or [file_name], year_column=year_column, projection=projection)
+            if skipped:
+                print(f"{skipped} 条记录缺少年份, 已跳过")
+            if len(year):
+                print(f"年份范围: {year.min()} ~ {year.max()}, 年份-作者对 {len(year)} 条")
+            df_weighted_edges = pairs_to_frame(*collapse_years(source, target, weights), names)
+        elif incremental:
+            with stage('incremental'):
+                added, changed, inserted = ingest_incremental(input_paths or [file_name], output, delta,
+                                                              projection=projection)
+            print(f"新记录 {added} 条, 变化的作者对 {changed} 个, 其中新增 {inserted} 个")
+            with stage('load_edges'):
+                df_weighted_edges = load_edge_frame(output)
+                df_weighted_edges = df_weighted_edges.sort_values(by='Weight', ascending=False, kind='stable')
+                df_weighted_edges = df_weighted_edges.reset_index(drop=True)
+        elif input_paths:
+            # 流式读取与计数在多个子进程中交错进行, 记为一个阶段
+            with stage('count_files', files=len(input_paths)):
+                df_weighted_edges = count_files(input_paths, projection=projection)
+        else:
+            with stage('read'):
+                df = pd.read_excel(file_name)
+
+            #处理作者数据
+            with stage('pairs', papers=len(df)):
+                df_weighted_edges = weighted_edges(df['Author-作者'], separator=';', **(projection or {}))
+        if not df_weighted_edges.empty:
+            print("合作最紧密的前10对作者:")
+            print(df_weighted_edges.head(10))
+        # 二进制边文件供 author.py 直接加载, Excel 仅作可选导出
+        if temporal:
+            with stage('save', edges=len(year)):
+                save_temporal(output, year, source, target, weights, names,
+                              {key: value for key, value in (projection or {}).items() if value is not None})
+        elif not incremental:
+            with stage('save', edges=len(df_weighted_edges)):
+                save_edge_frame(output, df_weighted_edges)
+        if export_excel:
+            with stage('export_excel', edges=len(df_weighted_edges)):
+                df_weighted_edges.to_excel(os.path.splitext(output)[0] + '.xlsx', index=False)
+
+    except FileNotFoundError as e:
+        print(f"错误：文件 '{e.filename or file_name}' 未找到。")
+    except Exception as e:
+        print(f"处理过程中发生错误: {e}")
+
+
+def add_arguments(parser):
+    # 预处理的命令行参数, sna.py 的 process 子命令共用
+    parser.add_argument('inputs', nargs='*', help='文献导出文件、目录或通配符')
+    parser.add_argument('--output', default='preprocess.edges', help='输出的边文件目录')
+    parser.add_argument('--delta', default='preprocess.delta', help='增量模式下本次变化的边文件目录')
+    parser.add_argument('--xlsx', action='store_true', help='同时导出与边文件同名的 .xlsx')
+    parser.add_argument('--weighting', choices=WEIGHTINGS, help='按超边投影计权: count 每对计 1, fractional 每对计 1/(k-1)')
+    parser.add_argument('--max-authors', type=int, help='作者数超过该值的论文按 --oversize 处理')
+    parser.add_argument('--oversize', choices=OVERSIZE_MODES, default='truncate',
+                        help='超大论文: truncate 保留前 N 位作者, drop 跳过, star 只连第一作者')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量模式: 按记录键跳过已处理的论文, 只累加新记录并输出 --delta')
+    parser.add_argument('--temporal', action='store_true',
+                        help='按发表年份分别计数, 输出带年份的边文件 (用于 sna.py trend 的时间切片分析)')
+    parser.add_argument('--year-column', default=YEAR_COLUMN, help='年份列名, 取其中的四位数年份')
+    profiling.add_arguments(parser)
+
+
+def run(args):
+    profiling.configure(args)
+    projection = {'weighting': args.weighting, 'max_authors': args.max_authors, 'oversize': args.oversize}
+    main(args.inputs, export_excel=args.xlsx, projection=projection, incremental=args.incremental,
+         output=args.output, delta=args.delta, temporal=args.temporal, year_column=args.year_column)
+
+
+# 多进程在 Windows 下需要主模块保护
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='作者合作网络预处理')
+    add_arguments(parser)
+    run(parser.parse_args())
@@ -0,0 +1,249 @@
+import atexit
+import cProfile
+import functools
+import json
+import os
+import re
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# 阶段计时与内存峰值记录: 用 stage(name, graph) 包住一个阶段, 或用 @profiled 装饰函数。
+# 未启用时 stage() 只做一次全局变量判断并返回空上下文, 开销可以忽略。
+# 启用方式: enable(...) 或环境变量 SNA_PROFILE=记录.json / SNA_TRACE=trace.json / SNA_CPROFILE=目录,
+# 后者无需改动脚本即可为 test1~test5 等脚本记录各指标调用; 进程退出时由主进程自动写出文件
+# (子进程不写文件, 其中测得的阶段经 timed_call 交回主进程登记)。
+# 每个阶段记录墙钟时间、CPU 时间、该阶段内的常驻内存峰值 (Linux 下通过重置 VmHWM 得到) 与图规模;
+# trace 文件为 Chrome trace-event 格式, 可在 chrome://tracing 或 Perfetto 中查看
+
+_PROFILER = None
+_NULL = nullcontext()
+_HWM_RESET = '/proc/self/clear_refs'
+_OWNER = 'SNA_PROFILE_OWNER'
+
+
+def graph_size(graph):
+    # 支持 CSRGraph 与 networkx 图; 其他对象返回 (None, None)
+    if hasattr(graph, 'n') and hasattr(graph, 'm'):
+        return int(graph.n), int(graph.m)
+    if hasattr(graph, 'number_of_nodes'):
+        return graph.number_of_nodes(), graph.number_of_edges()
+    return None, None
+
+
+def read_hwm():
+    # 当前进程的常驻内存峰值 (字节); Linux 读取 VmHWM (可被重置), 其他平台退回 ru_maxrss (进程生命周期峰值)
+    try:
+        with open('/proc/self/status') as f:
+            match = re.search(r'VmHWM:\s+(\d+) kB', f.read())
+        if match:
+            return int(match.group(1)) * 1024
+    except OSError:
+        pass
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def reset_hwm():
+    try:
+        with open(_HWM_RESET, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class Profiler:
+    def __init__(self, path=None, trace=None, profile_dir=None):
+        self.path = path
+        self.trace = trace
+        self.profile_dir = profile_dir
+        self.records = []
+        self.origin = time.perf_counter()
+        self.epoch = time.time()
+        self._stack = []
+        self._lock = threading.Lock()
+        self._profiles = []
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    @contextmanager
+    def stage(self, name, graph=None, **extra):
+        nodes, edges = graph_size(graph)
+        record = {'stage': name, 'nodes': nodes, 'edges': edges, 'pid': os.getpid(),
+                  'thread': threading.get_ident(), 'depth': len(self._stack), **extra}
+        # 重置峰值前先把目前为止的峰值记到外层阶段上, 嵌套阶段互不影响
+        self._propagate(read_hwm())
+        record['reset'] = reset_hwm()
+        frame = {'peak': read_hwm()}
+        self._stack.append(frame)
+        profile = None
+        if self.profile_dir:
+            # 同一时刻只能有一个 cProfile 生效: 进入嵌套阶段时暂停外层的, 每个 .prof 只含本阶段自身 (不含子阶段) 的调用
+            if self._profiles:
+                self._profiles[-1].disable()
+            profile = cProfile.Profile()
+            self._profiles.append(profile)
+            profile.enable()
+        start, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['start'] = start - self.origin
+            record['seconds'] = time.perf_counter() - start
+            record['cpu_seconds'] = time.process_time() - cpu
+            if profile is not None:
+                profile.disable()
+                self._profiles.pop()
+                record['profile'] = os.path.join(self.profile_dir, f"{len(self.records):04d}_{safe_name(name)}.prof")
+                profile.dump_stats(record['profile'])
+                if self._profiles:
+                    self._profiles[-1].enable()
+            self._stack.pop()
+            frame['peak'] = max(frame['peak'], read_hwm())
+            self._propagate(frame['peak'])
+            record['peak_rss_bytes'] = frame['peak']
+            self.add(record)
+
+    def _propagate(self, peak):
+        for frame in self._stack:
+            frame['peak'] = max(frame['peak'], peak)
+
+    def add(self, record):
+        # 也用于登记子进程中测得的阶段 (如流水线任务), 子进程记录的起点是 time.time()
+        if 'start' not in record:
+            record['start'] = record.pop('epoch') - self.epoch
+        record.setdefault('depth', len(self._stack))
+        with self._lock:
+            self.records.append(record)
+
+    def add_remote(self, records, **fields):
+        # 登记 timed_call 交回的记录: 第一条是整个调用, 补上 fields (阶段名、图规模); 其余为调用内部的阶段, 深度接在其下
+        depth = len(self._stack)
+        call, *inner = records
+        self.add(dict(call, depth=depth, **fields))
+        for record in inner:
+            self.add(dict(record, depth=depth + 1 + record['depth']))
+
+    def dump(self, path=None, trace=None):
+        path, trace = path or self.path, trace or self.trace
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'argv': sys.argv, 'stages': self.records}, f, ensure_ascii=False, indent=1)
+        if path or trace:
+            print(f"阶段记录已保存至 '{path or trace}'。")
+        if trace:
+            events = [{'name': r['stage'], 'ph': 'X', 'ts': r['start'] * 1e6, 'dur': r['seconds'] * 1e6,
+                       'pid': r['pid'], 'tid': r['thread'],
+                       'args': {key: value for key, value in r.items()
+                                if key not in ('stage', 'start', 'seconds', 'pid', 'thread')}}
+                      for r in self.records]
+            with open(trace, 'w', encoding='utf-8') as f:
+                json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+    def summary(self):
+        # 按阶段名汇总的表格文本, 便于在终端直接查看
+        lines = [f"{'阶段':<24}{'次数':>6}{'墙钟(s)':>12}{'CPU(s)':>12}{'峰值内存(MB)':>16}"]
+        totals = {}
+        for r in self.records:
+            entry = totals.setdefault(r['stage'], [0, 0.0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += r['seconds']
+            entry[2] += r['cpu_seconds']
+            entry[3] = max(entry[3], r.get('peak_rss_bytes') or 0)
+        for name, (count, wall, cpu, peak) in totals.items():
+            lines.append(f"{name:<24}{count:>6}{wall:>12.3f}{cpu:>12.3f}{peak / 2 ** 20:>16.1f}")
+        return '\n'.join(lines)
+
+
+def safe_name(name):
+    return re.sub(r'[^\w.-]+', '_', name)
+
+
+def is_main_process():
+    # 首个检查的进程把自己的 pid 写入环境变量, 子进程 (fork / spawn) 继承后据此知道自己不是主进程;
+    # 不能用 multiprocessing.parent_process(): spawn 子进程在解包初始化函数时就会导入本模块, 那时它还是 None
+    return os.environ.setdefault(_OWNER, str(os.getpid())) == str(os.getpid())
+
+
+def enable(path=None, trace=None, profile_dir=None):
+    # 开启记录并在进程退出时写出 (只在主进程中登记, spawn 方式的子进程不会覆盖主进程的输出文件); 返回 Profiler
+    global _PROFILER
+    if _PROFILER is not None:
+        atexit.unregister(_PROFILER.dump)
+    _PROFILER = Profiler(path, trace, profile_dir)
+    if is_main_process():
+        atexit.register(_PROFILER.dump)
+    return _PROFILER
+
+
+def disable():
+    global _PROFILER
+    profiler, _PROFILER = _PROFILER, None
+    if profiler is not None:
+        atexit.unregister(profiler.dump)
+    return profiler
+
+
+def active():
+    return _PROFILER
+
+
+def stage(name, graph=None, **extra):
+    if _PROFILER is None:
+        return _NULL
+    return _PROFILER.stage(name, graph, **extra)
+
+
+def profiled(func=None, name=None):
+    # 装饰器: 以函数名 (或 name) 为阶段名, 第一个参数是图时记录其规模
+    if func is None:
+        return functools.partial(profiled, name=name)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _PROFILER is None:
+            return func(*args, **kwargs)
+        with _PROFILER.stage(name or func.__name__, args[0] if args else None):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def timed_call(func, *args):
+    # 在子进程中执行并测量, 返回 (结果, 记录列表): 第一条是整个调用, 其后是调用内部 stage / @profiled 的记录
+    # (执行期间换上一个只收集不写文件的 Profiler); 起点均为 time.time(), 由主进程调用 add_remote() 登记
+    global _PROFILER
+    outer, collector = _PROFILER, Profiler()
+    _PROFILER = collector
+    epoch, reset = time.time(), reset_hwm()
+    start, cpu = time.perf_counter(), time.process_time()
+    try:
+        value = func(*args)
+    finally:
+        _PROFILER = outer
+    record = {'epoch': epoch, 'seconds': time.perf_counter() - start, 'cpu_seconds': time.process_time() - cpu,
+              'peak_rss_bytes': read_hwm(), 'reset': reset, 'pid': os.getpid(), 'thread': threading.get_ident()}
+    inner = [dict({key: item for key, item in r.items() if key != 'start'}, epoch=collector.epoch + r['start'])
+             for r in collector.records]
+    return value, [record, *inner]
+
+
+def add_arguments(parser):
+    # 各命令行入口共用的记录选项
+    parser.add_argument('--profile', metavar='JSON', help='记录各阶段的耗时、CPU 时间、内存峰值与图规模')
+    parser.add_argument('--trace', metavar='JSON', help='以 Chrome trace-event 格式记录各阶段')
+    parser.add_argument('--cprofile-dir', metavar='DIR', help='为每个阶段保存一份 cProfile 结果 (.prof)')
+
+
+def configure(args):
+    # 命令行给出任一记录选项时开启; 否则保持环境变量决定的状态
+    if args.profile or args.trace or args.cprofile_dir:
+        return enable(args.profile, args.trace, args.cprofile_dir)
+    return _PROFILER
+
+
+if is_main_process() and (os.environ.get('SNA_PROFILE') or os.environ.get('SNA_TRACE') or
+                          os.environ.get('SNA_CPROFILE')):
+    enable(os.environ.get('SNA_PROFILE'), os.environ.get('SNA_TRACE'), os.environ.get('SNA_CPROFILE'))
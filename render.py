@@ -0,0 +1,122 @@
+import numpy as np
+import matplotlib.colors as mcolors
+from scipy import ndimage
+
+# 大规模网络的绘图后端: 边累加成一张密度栅格图, 节点和标签仍为矢量;
+# 直径不足一个像素的节点改为栅格化绘制, PDF 中不再为每条边/每个点写一条路径
+
+RASTER_EDGE_LIMIT = 20000
+
+
+def data_extent(xy, margin=0.05):
+    # 返回 ((x0, y0), (x1, y1)), 四周留出 margin 比例的空白
+    lo = xy.min(axis=0)
+    hi = xy.max(axis=0)
+    pad = np.where(hi > lo, (hi - lo) * margin, 1.0)
+    return lo - pad, hi + pad
+
+
+def raster_shape(ax, dpi, max_size=4096):
+    # 按输出分辨率计算坐标轴所占的像素数, 单边不超过 max_size; 同时返回每磅对应的像素数
+    bbox = ax.get_window_extent()
+    width = bbox.width / ax.figure.dpi * dpi
+    height = bbox.height / ax.figure.dpi * dpi
+    scale = min(1.0, max_size / max(width, height, 1))
+    shape = (max(int(height * scale), 1), max(int(width * scale), 1))
+    return shape, dpi / 72 * scale
+
+
+def edge_density(xy, source, target, extent, shape, weights=None, chunk_samples=2 ** 22, max_samples=2 ** 27):
+    # 沿每条边按像素步长采样 (DDA), 每条边在经过的每个像素上计一次, 分块累加避免一次展开全部采样点
+    # 采样点总数超过 max_samples 时 (长边很多的毛球图) 先在粗网格上累加再双线性放大
+    (x0, y0), (x1, y1) = extent
+    height, width = shape
+    px = (xy[:, 0] - x0) / (x1 - x0) * (width - 1)
+    py = (xy[:, 1] - y0) / (y1 - y0) * (height - 1)
+    dx = px[target] - px[source]
+    dy = py[target] - py[source]
+    steps = np.ceil(np.maximum(np.abs(dx), np.abs(dy))).astype(np.int64) + 1
+    total = steps.sum()
+    if max_samples and total > max_samples and min(shape) > 64:
+        factor = int(np.ceil(total / max_samples))
+        coarse = (max(height // factor, 16), max(width // factor, 16))
+        counts = edge_density(xy, source, target, extent, coarse, weights, chunk_samples, None)
+        return ndimage.zoom(counts, (height / coarse[0], width / coarse[1]), order=1)
+    # 每条边上相邻采样点的坐标增量, 起点取像素中心 +0.5 后截断即为四舍五入
+    step_x = (dx / np.maximum(steps - 1, 1)).astype(np.float32)
+    step_y = (dy / np.maximum(steps - 1, 1)).astype(np.float32)
+    start_x = (px[source] + 0.5).astype(np.float32)
+    start_y = (py[source] + 0.5).astype(np.float32)
+    ends = np.cumsum(steps)
+    counts = np.zeros(height * width)
+    start = 0
+    while start < len(steps):
+        done = ends[start - 1] if start else 0
+        stop = max(int(np.searchsorted(ends, done + chunk_samples, side='right')), start + 1)
+        block = steps[start:stop]
+        offset = np.arange(block.sum(), dtype=np.float32) - np.repeat((np.cumsum(block) - block).astype(np.float32), block)
+        x = (np.repeat(start_x[start:stop], block) + np.repeat(step_x[start:stop], block) * offset).astype(np.int32)
+        y = (np.repeat(start_y[start:stop], block) + np.repeat(step_y[start:stop], block) * offset).astype(np.int32)
+        pixel = y.astype(np.int64) * width + x
+        sample_weights = None if weights is None else np.repeat(np.asarray(weights, dtype=float)[start:stop], block)
+        counts += np.bincount(pixel, weights=sample_weights, minlength=height * width)
+        start = stop
+    return counts.reshape(height, width)
+
+
+def raster_edges(ax, xy, source, target, edge_color='grey', alpha=0.15, width=1.0, dpi=300, extent=None,
+                 weights=None, max_size=4096, zorder=1):
+    # 把所有边画成一张 RGBA 图: 像素透明度按 alpha 叠加 c 次的结果 1 - (1 - alpha)^c 计算,
+    # 与逐条绘制半透明线段的观感一致
+    xy = np.asarray(xy, dtype=float)
+    extent = extent if extent is not None else data_extent(xy)
+    shape, pixels_per_point = raster_shape(ax, dpi, max_size)
+    counts = edge_density(xy, np.asarray(source), np.asarray(target), extent, shape, weights)
+    line = int(round(width * pixels_per_point))
+    if line > 1:
+        # 一像素宽的采样线按线宽做盒式扩张, 乘回 line 保持线上计数不变
+        counts = ndimage.uniform_filter(counts, size=line) * line
+    image = np.empty(shape + (4,), dtype=np.uint8)
+    image[..., :3] = (np.array(mcolors.to_rgb(edge_color)) * 255).astype(np.uint8)
+    image[..., 3] = np.rint((1 - (1 - alpha) ** counts) * 255).astype(np.uint8)
+    (x0, y0), (x1, y1) = extent
+    artist = ax.imshow(image, extent=(x0, x1, y0, y1), origin='lower', aspect='auto', interpolation='none',
+                       zorder=zorder)
+    ax.set_xlim(x0, x1)
+    ax.set_ylim(y0, y1)
+    return artist
+
+
+def lod_nodes(ax, xy, sizes, colors, dpi=300, min_pixels=1.0, **kwargs):
+    # sizes 与 scatter 的 s 相同 (磅的平方); 直径不足 min_pixels 像素的节点单独栅格化,
+    # 其余仍为矢量。颜色为数值时两组共用同一个色标范围
+    xy = np.asarray(xy, dtype=float)
+    n = len(xy)
+    sizes = np.broadcast_to(np.asarray(sizes, dtype=float), n)
+    per_node = np.ndim(colors) > 0 and len(colors) == n and not isinstance(colors, str)
+    if per_node:
+        colors = np.asarray(colors)
+        if colors.dtype.kind in 'fiu' and colors.ndim == 1:
+            kwargs.setdefault('vmin', colors.min())
+            kwargs.setdefault('vmax', colors.max())
+    small = np.sqrt(sizes) * dpi / 72 < min_pixels
+    artists = []
+    for mask, rasterized in ((small, True), (~small, False)):
+        if mask.any():
+            artists.append(ax.scatter(xy[mask, 0], xy[mask, 1], s=sizes[mask], c=colors[mask] if per_node else colors,
+                                      rasterized=rasterized, zorder=2, **kwargs))
+    return artists
+
+
+def draw_networkx_edges(G, pos, ax=None, raster_limit=RASTER_EDGE_LIMIT, dpi=300, edge_color='k', alpha=None,
+                        width=1.0, **kwargs):
+    # 边数不超过 raster_limit 时直接调用 nx.draw_networkx_edges, 结果与原来相同; 否则画成密度栅格图
+    import networkx as nx
+    import matplotlib.pyplot as plt
+    if G.number_of_edges() <= raster_limit:
+        return nx.draw_networkx_edges(G, pos, ax=ax, edge_color=edge_color, alpha=alpha, width=width, **kwargs)
+    ax = ax or plt.gca()
+    index = {node: i for i, node in enumerate(G)}
+    xy = np.array([pos[node] for node in G])
+    edges = np.array([(index[u], index[v]) for u, v in G.edges()])
+    return raster_edges(ax, xy, edges[:, 0], edges[:, 1], edge_color, 1.0 if alpha is None else alpha, width, dpi)
@@ -0,0 +1,193 @@
+import argparse
+import os
+import sys
+
+import profiling
+from profiling import stage
+
+# 统一的命令行入口: process / author / centrality / community / trend 五个子命令。
+# 各子命令只在执行时导入所需模块, 绘图库 (matplotlib) 只在需要出图时导入;
+# 一次调用可以依次处理多个数据集, 共用同一个解释器、磁盘缓存与已导入的模块
+#
+#   python sna.py process 文献/*.xlsx --output preprocess.edges
+#   python sna.py author a.edges b.edges --metrics degree,betweenness,pagerank --no-plot
+#   python sna.py centrality a.edges --output-dir results
+#   python sna.py community a.edges b.edges --runs 16 --output-dir results
+#   python sna.py process 文献/*.xlsx --temporal --output yearly.edges
+#   python sna.py trend yearly.edges --window 3 --output-dir results
+#   python sna.py author a.edges --no-plot --profile stages.json --trace trace.json --cprofile-dir prof
+
+
+def dataset_name(path):
+    return os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+
+
+def open_cache(args):
+    from cache import MetricCache
+    return None if args.no_cache else MetricCache()
+
+
+def output_path(args, path, suffix):
+    os.makedirs(args.output_dir, exist_ok=True)
+    return os.path.join(args.output_dir, f"{dataset_name(path)}{suffix}")
+
+
+def load(path):
+    from author import load_graph
+    try:
+        with stage('load', path=path):
+            return load_graph(path)[0]
+    except Exception as e:
+        print(f"加载文件 {path} 时出错: {e}")
+        return None
+
+
+def run_process(args, arguments):
+    # 预处理的参数由 process.py 自己解析, 避免为其他子命令导入预处理模块
+    import process
+    parser = argparse.ArgumentParser(prog='sna.py process', description='作者合作网络预处理')
+    process.add_arguments(parser)
+    process.run(parser.parse_args(arguments))
+
+
+def run_author(args):
+    from author import analyze_author_network
+    cache = open_cache(args)
+    for path in args.inputs:
+        print(f"\n===== {path} =====")
+        analyze_author_network(path, approx_error=args.approx_error, time_budget=args.time_budget, cache=cache,
+                               holes_top_n=args.holes_top_n, community_runs=args.community_runs,
+                               workers=args.workers, metrics=args.metrics, plot=not args.no_plot,
+                               output_image_file=output_path(args, path, '.png'))
+
+
+def run_centrality(args):
+    import pandas as pd
+    from centrality import fused_centrality, pagerank
+    cache = open_cache(args)
+    weighted = not args.unweighted
+    for path in args.inputs:
+        print(f"\n===== {path} =====")
+        graph = load(path)
+        if graph is None:
+            continue
+        params = {'weighted': weighted, 'normalized': True, 'max_iter': 1000}
+        compute = lambda: fused_centrality(graph, weighted=weighted, max_iter=1000, workers=args.workers)
+        with stage('fused_centrality', graph):
+            scores = cache.get_or_compute(graph, 'fused_centrality', params, compute) if cache else compute()
+        with stage('pagerank', graph):
+            ranks = pagerank(graph, weighted=weighted, max_iter=1000)
+        table = pd.DataFrame({'Author': graph.names, **scores, 'PageRank': ranks})
+        table = table.sort_values(by='Betweenness', ascending=False, kind='stable')
+        print(table.head(10).to_markdown(index=False, numalign="left", stralign="left"))
+        output_file = output_path(args, path, '_centrality.csv')
+        table.to_csv(output_file, index=False, encoding='utf-8-sig')
+        print(f"中心性结果已保存至 '{output_file}'。")
+
+
+def run_community(args):
+    import numpy as np
+    import pandas as pd
+    from community import consensus_louvain, evaluate_partitions
+    for path in args.inputs:
+        print(f"\n===== {path} =====")
+        graph = load(path)
+        if graph is None:
+            continue
+        consensus = consensus_louvain(graph, runs=args.runs, seed=args.seed, resolution=args.resolution,
+                                      workers=args.workers)
+        scores = evaluate_partitions(graph, np.vstack([consensus.labels, consensus.runs]),
+                                     resolution=args.resolution)
+        print(f"共识划分: {scores['Communities'][0]} 个社区, 最大社区 {scores['Largest'][0]} 人, "
+              f"模块度 {scores['Modularity'][0]:.6f}")
+        print(f"{args.runs} 次运行的模块度: {scores['Modularity'][1:].min():.6f} ~ "
+              f"{scores['Modularity'][1:].max():.6f}, 平均稳定性: {consensus.stability.mean():.4f}")
+        output_file = output_path(args, path, '_communities.csv')
+        pd.DataFrame({'Author': graph.names, 'Community': consensus.labels}).to_csv(output_file, index=False,
+                                                                                  encoding='utf-8-sig')
+        print(f"社区划分已保存至 '{output_file}'。")
+
+
+def run_trend(args):
+    from temporal import is_temporal_store, load_temporal
+    for path in args.inputs:
+        print(f"\n===== {path} =====")
+        if not is_temporal_store(path):
+            print(f"'{path}' 不是按年份计数的边文件, 请先用 process --temporal 生成")
+            continue
+        with stage('load', path=path):
+            network = load_temporal(path)
+        table = network.trend(window=args.window, step=args.step, cumulative=args.cumulative, first=args.first,
+                              last=args.last)
+        print(table.to_markdown(index=False, numalign="left", stralign="left"))
+        output_file = output_path(args, path, '_trend.csv')
+        table.to_csv(output_file, index=False, encoding='utf-8-sig')
+        print(f"时间切片结果已保存至 '{output_file}'。")
+
+
+def metric_list(text):
+    from author import METRICS
+    metrics = [name.strip() for name in text.split(',') if name.strip()]
+    unknown = [name for name in metrics if name not in METRICS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"未知的指标: {', '.join(unknown)} (可选: {', '.join(METRICS)})")
+    return metrics
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='作者合作网络分析')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('process', add_help=False, help='预处理文献导出文件, 生成边文件 (参数同 process.py)')
+
+    shared = argparse.ArgumentParser(add_help=False)
+    shared.add_argument('inputs', nargs='+', help='边文件目录或预处理得到的 .xlsx, 可以有多个')
+    shared.add_argument('--workers', type=int, help='并行进程数, 默认 CPU 核数')
+    shared.add_argument('--output-dir', default='.', help='结果文件的输出目录')
+    profiling.add_arguments(shared)
+
+    author = commands.add_parser('author', parents=[shared], help='完整的作者网络分析')
+    author.add_argument('--metrics', type=metric_list, help='只计算这些指标, 逗号分隔')
+    author.add_argument('--no-plot', action='store_true', help='无图模式: 不计算布局、不导入绘图库')
+    author.add_argument('--approx-error', type=float, help='中介/接近中心性改用抽样近似的目标误差')
+    author.add_argument('--time-budget', type=float, help='近似计算的时间预算 (秒)')
+    author.add_argument('--holes-top-n', type=int, default=100, help='计算结构洞指标的作者数')
+    author.add_argument('--community-runs', type=int, default=0, help='Louvain 种子数, 默认 0 跳过社区检测')
+    author.add_argument('--no-cache', action='store_true', help='不读写指标缓存')
+
+    centrality = commands.add_parser('centrality', parents=[shared], help='全部节点的中心性表 (CSV)')
+    centrality.add_argument('--unweighted', action='store_true', help='忽略 Weight, 按跳数计算')
+    centrality.add_argument('--no-cache', action='store_true', help='不读写指标缓存')
+
+    community = commands.add_parser('community', parents=[shared], help='多种子 Louvain 共识社区划分 (CSV)')
+    community.add_argument('--runs', type=int, default=32, help='Louvain 种子数')
+    community.add_argument('--seed', type=int, default=42)
+    community.add_argument('--resolution', type=float, default=1.0)
+
+    trend = commands.add_parser('trend', parents=[shared], help='逐年份区间的网络指标 (CSV), 快照之间增量更新')
+    trend.add_argument('--window', type=int, default=1, help='每个快照包含的年数')
+    trend.add_argument('--step', type=int, default=1, help='相邻快照之间移动的年数')
+    trend.add_argument('--cumulative', action='store_true', help='快照从首年开始逐步累积')
+    trend.add_argument('--first', type=int, help='起始年份, 默认为数据中的首年')
+    trend.add_argument('--last', type=int, help='结束年份, 默认为数据中的末年')
+    return parser
+
+
+COMMANDS = {'author': run_author, 'centrality': run_centrality, 'community': run_community, 'trend': run_trend}
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, arguments = parser.parse_known_args(argv)
+    if args.command == 'process':
+        run_process(args, arguments)
+    elif arguments:
+        parser.error(f"无法识别的参数: {' '.join(arguments)}")
+    else:
+        profiling.configure(args)
+        COMMANDS[args.command](args)
+
+
+# 多进程在 Windows 下需要主模块保护
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,311 @@
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from csrgraph import CSRGraph
+from edgestore import save_edges, load_edges
+from incremental import edge_keys, read_meta, write_meta
+from ingest import AUTHOR_COLUMN, expand_inputs, iter_column_chunks
+from pairs import encode_authors, pair_counts
+from profiling import stage
+from triangles import CHUNK_WEDGES, triangle_counts
+from unionfind import new_parent, union_edges, find_roots, component_labels
+
+# 按年份切片的合作网络: 作者对按发表年份分别计数 (边文件中每行为 年份-作者对), 快照为一个年份区间内各年之和。
+# 相邻快照之间只应用移出/移入窗口的那几年的边增量, 不重新建图:
+# 度数与强度按变化的边直接增减; 连通分量对新边用并查集合并, 有边消失时只重算受影响的分量;
+# 三角形数只从变化的边出发枚举楔形得到增量, 聚类系数与传递性随之更新。
+# 逐年滚动 20 年的趋势分析, 总开销与一次完整建图加三角形计数相当
+
+YEAR_COLUMN = 'Year-年'
+# 变化边超过新快照边数的这一比例时 (如互不重叠的逐年窗口), 逐边枚举楔形比直接重新计数更慢,
+# 该步改为对新快照整体重算三角形与连通分量
+REBUILD_FRACTION = 0.3
+TREND_COLUMNS = ('Start', 'End', 'Nodes', 'Edges', 'Density', 'Components', 'Largest', 'Average Clustering',
+                 'Transitivity', 'Total Weight', 'Added', 'Removed')
+
+
+def parse_years(values):
+    # 取每个值中的第一个四位数作为年份 (兼容 2019、2019.0、2019-05-01 等写法), 无法识别时为 nan
+    text = pd.Series(values, dtype=object).astype(str)
+    return pd.to_numeric(text.str.extract(r'(\d{4})', expand=False), errors='coerce')
+
+
+def count_yearly_pairs(authors, years, separator=';', projection=None):
+    # 返回 (year, source, target, weight, names), 按 (年份, source, target) 排序;
+    # 作者字典覆盖全部年份, 只收录出现在作者对中的作者, 与完整预处理一致
+    frame = pd.DataFrame({'authors': np.asarray(authors, dtype=object), 'year': np.asarray(years)}).dropna()
+    frame = frame.sort_values(by='year', kind='stable')
+    codes, offsets, names = encode_authors(frame['authors'], separator)
+    paper_years = frame['year'].to_numpy().astype(np.int64)
+    bounds = np.flatnonzero(np.diff(paper_years)) + 1
+    parts = []
+    for lo, hi in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(paper_years)]])):
+        block = offsets[lo:hi + 1]
+        source, target, weights = pair_counts(codes[block[0]:block[-1]], block - block[0], len(names), projection)
+        parts.append((np.full(len(source), paper_years[lo]), source, target, weights))
+    if not parts:
+        empty = np.array([], dtype=np.int32)
+        return np.array([], dtype=np.int64), empty, empty, np.array([], dtype=np.int64), names[:0]
+    year, source, target, weights = (np.concatenate(column) for column in zip(*parts))
+    used = np.zeros(len(names), dtype=bool)
+    used[source] = used[target] = True
+    mapping = np.cumsum(used) - 1
+    return year, mapping[source].astype(np.int32), mapping[target].astype(np.int32), weights, names[used]
+
+
+def read_yearly_pairs(paths, column=AUTHOR_COLUMN, year_column=YEAR_COLUMN, separator=';', chunk_size=50000,
+                      projection=None):
+    # 流式读取作者列与年份列; 返回 count_yearly_pairs 的结果与缺少年份而被跳过的记录数
+    authors, years = [], []
+    for path in expand_inputs(paths):
+        for chunk in iter_column_chunks(path, [column, year_column], chunk_size):
+            authors.append(chunk[column].to_numpy(dtype=object))
+            years.append(parse_years(chunk[year_column]).to_numpy())
+    authors = np.concatenate(authors) if authors else np.array([], dtype=object)
+    years = np.concatenate(years) if years else np.array([])
+    skipped = int((np.isnan(years) & pd.notna(authors)).sum())
+    return (*count_yearly_pairs(authors, years, separator, projection), skipped)
+
+
+def collapse_years(source, target, weights):
+    # 各年份合并为静态网络: 同一作者对的 Weight 求和; 整数权重保持原类型, 与普通边文件的图指纹一致
+    weights = np.asarray(weights)
+    keys, inverse = np.unique(edge_keys(source, target), return_inverse=True)
+    total = np.bincount(inverse, weights=weights, minlength=len(keys))
+    if weights.dtype.kind in 'iu':
+        total = total.astype(weights.dtype)
+    return (keys >> 32).astype(np.int32), (keys & 0xFFFFFFFF).astype(np.int32), total
+
+
+def save_temporal(path, year, source, target, weights, names, projection=None):
+    # 与普通边文件同一格式, 另存每条边的年份 (year.npy); 连通分量按各年份合并后的静态网络计算
+    components = component_labels(len(names), *collapse_years(source, target, weights)[:2])
+    save_edges(path, source, target, weights, names, components)
+    np.save(os.path.join(path, 'year.npy'), np.asarray(year, dtype=np.int32))
+    years = [int(year.min()), int(year.max())] if len(year) else []
+    write_meta(path, dict(read_meta(path), temporal={'years': years, 'projection': projection or {}}))
+
+
+def is_temporal_store(path):
+    return os.path.isfile(os.path.join(path, 'year.npy'))
+
+
+def load_temporal(path):
+    source, target, weights, names = load_edges(path, mmap=False)
+    return TemporalNetwork(np.load(os.path.join(path, 'year.npy')), source, target, weights, names)
+
+
+def year_windows(first, last, window=1, step=1, cumulative=False):
+    # 返回 [(起始年, 结束年), ...]; cumulative 时起始年固定为 first, 快照逐步累积
+    ends = range(first + window - 1, last + 1, step)
+    return [(first if cumulative else end - window + 1, end) for end in ends]
+
+
+def symmetric(source, target, n):
+    # 无权、无自环的对称邻接矩阵
+    rows, cols = np.concatenate([source, target]), np.concatenate([target, source])
+    return sp.csr_matrix((np.ones(len(rows), dtype=np.int64), (rows, cols)), shape=(n, n))
+
+
+def changed_triangles(source, target, matrix):
+    # 图 matrix (对称、无自环、行内有序) 中至少含一条变化边 (source, target) 的三角形, 按节点计数。
+    # 两端点邻接行逐元素相乘 (有序归并) 即得每条变化边上的公共邻居, 也就是三角形的第三个顶点;
+    # 一个三角形含多条变化边时只由键最小的那条计入。代价与变化边端点的度数之和成正比, 与图的总规模无关
+    n = matrix.shape[0]
+    triangles = np.zeros(n, dtype=np.int64)
+    if len(source) == 0:
+        return triangles
+    degree = np.diff(matrix.indptr)
+    key = np.minimum(source, target) * n + np.maximum(source, target)
+    changed = np.sort(key)
+    work = np.cumsum(degree[source] + degree[target])
+    first = 0
+    while first < len(source):
+        last = max(int(np.searchsorted(work, work[first] + CHUNK_WEDGES, side='left')), first + 1)
+        common = matrix[source[first:last]].multiply(matrix[target[first:last]]).tocsr()
+        count = np.diff(common.indptr)
+        a, b = np.repeat(source[first:last], count), np.repeat(target[first:last], count)
+        w, own = common.indices.astype(np.int64), np.repeat(key[first:last], count)
+        keep = np.ones(len(w), dtype=bool)
+        for x in (a, b):
+            other = np.minimum(x, w) * n + np.maximum(x, w)
+            hit = changed[np.minimum(np.searchsorted(changed, other), len(changed) - 1)] == other
+            keep &= ~(hit & (other < own))
+        for vertex in (a, b, w):
+            triangles += np.bincount(vertex[keep], minlength=n)
+        first = last
+    return triangles
+
+
+class TemporalNetwork:
+    def __init__(self, year, source, target, weights, names):
+        order = np.lexsort((target, source, year))
+        year = np.asarray(year)[order]
+        self.names = np.asarray(names, dtype=object)
+        self.n = len(self.names)
+        self.years, starts = np.unique(year, return_index=True)
+        self.year_ptr = np.append(starts, len(year))
+        # 所有年份出现过的作者对统一编号, 快照只维护每对在窗口内出现的年数与 Weight 之和
+        keys, self.row_pair = np.unique(edge_keys(np.asarray(source)[order], np.asarray(target)[order]),
+                                        return_inverse=True)
+        self.row_weight = np.asarray(weights)[order]
+        self.pair_source = (keys >> 32).astype(np.int64)
+        self.pair_target = (keys & 0xFFFFFFFF).astype(np.int64)
+        self.reset()
+
+    def reset(self):
+        # 回到空快照
+        pairs = len(self.pair_source)
+        self.window = np.array([], dtype=self.years.dtype)
+        self.present = np.zeros(pairs, dtype=np.int32)
+        self.pair_weight = np.zeros(pairs, dtype=self.row_weight.dtype if len(self.row_weight) else np.int64)
+        self.m = 0
+        self.degree = np.zeros(self.n, dtype=np.int64)
+        self.strength = np.zeros(self.n, dtype=self.pair_weight.dtype)
+        self.loops = np.zeros(self.n, dtype=np.int64)
+        self.triangles = np.zeros(self.n, dtype=np.int64)
+        self.parent = new_parent(self.n)
+        self.matrix = sp.csr_matrix((self.n, self.n), dtype=np.int64)
+        self.added = self.removed = 0
+
+    def rows(self, years):
+        # 给定年份的边所在的行号
+        index = np.searchsorted(self.years, years)
+        return np.concatenate([np.arange(self.year_ptr[i], self.year_ptr[i + 1]) for i in index]) \
+            if len(index) else np.array([], dtype=np.int64)
+
+    def advance(self, start, end):
+        # 把当前快照移到 [start, end]: 只应用移出与移入窗口的年份, 返回 (新增边数, 消失边数)
+        window = self.years[(self.years >= start) & (self.years <= end)]
+        leaving, entering = self.rows(np.setdiff1d(self.window, window)), self.rows(np.setdiff1d(window, self.window))
+        self.window = window
+        pair = np.concatenate([self.row_pair[leaving], self.row_pair[entering]])
+        touched, inverse = np.unique(pair, return_inverse=True)
+        sign = np.concatenate([-np.ones(len(leaving)), np.ones(len(entering))])
+        weight_change = np.concatenate([-self.row_weight[leaving], self.row_weight[entering]])
+        before = self.present[touched] > 0
+        self.present[touched] += np.bincount(inverse, weights=sign, minlength=len(touched)).astype(np.int32)
+        delta = np.bincount(inverse, weights=weight_change, minlength=len(touched))
+        self.pair_weight[touched] += delta.astype(self.pair_weight.dtype)
+        after = self.present[touched] > 0
+        removed, inserted = touched[before & ~after], touched[~before & after]
+        self.added, self.removed = len(inserted), len(removed)
+
+        # 度数与强度: 自环两端是同一节点, 按 networkx 的约定计 2
+        s, t = self.pair_source[touched], self.pair_target[touched]
+        self.strength += (np.bincount(s, weights=delta, minlength=self.n) +
+                          np.bincount(t, weights=delta, minlength=self.n)).astype(self.strength.dtype)
+        change = np.concatenate([-np.ones(len(removed), dtype=np.int64), np.ones(len(inserted), dtype=np.int64)])
+        ends = np.concatenate([removed, inserted])
+        s, t = self.pair_source[ends], self.pair_target[ends]
+        self.degree += np.bincount(s, weights=change, minlength=self.n).astype(np.int64) + \
+            np.bincount(t, weights=change, minlength=self.n).astype(np.int64)
+        loop = s == t
+        self.loops += np.bincount(s[loop], weights=change[loop], minlength=self.n).astype(np.int64)
+        self.m += len(inserted) - len(removed)
+
+        # 三角形: 先去掉消失的边 (在旧图上数含消失边的三角形), 再加入新边 (在新图上数含新边的三角形);
+        # 自环不构成三角形, 也不影响连通性
+        removed = removed[self.pair_source[removed] != self.pair_target[removed]]
+        inserted = inserted[self.pair_source[inserted] != self.pair_target[inserted]]
+        rebuild = len(removed) + len(inserted) > REBUILD_FRACTION * self.m
+        if len(removed):
+            if not rebuild:
+                self.triangles -= changed_triangles(self.pair_source[removed], self.pair_target[removed],
+                                                    self.matrix)
+            self.matrix = self.matrix - symmetric(self.pair_source[removed], self.pair_target[removed], self.n)
+        if len(inserted):
+            self.matrix = self.matrix + symmetric(self.pair_source[inserted], self.pair_target[inserted], self.n)
+            self.matrix.sort_indices()
+            if not rebuild:
+                self.triangles += changed_triangles(self.pair_source[inserted], self.pair_target[inserted],
+                                                    self.matrix)
+        self.matrix.eliminate_zeros()
+        self.matrix.sort_indices()
+        if rebuild:
+            snapshot = CSRGraph(self.matrix.indptr, self.matrix.indices, self.matrix.data, self.names)
+            self.triangles = triangle_counts(snapshot)
+            rows = np.repeat(np.arange(self.n), np.diff(self.matrix.indptr))
+            self.parent = union_edges(new_parent(self.n), rows, self.matrix.indices)
+            return self.added, self.removed
+
+        # 连通分量: 边消失时只有它所在的分量可能分裂, 把这些分量拆散后按现有的边重新合并
+        if len(removed):
+            roots = np.unique(self.parent[self.pair_source[removed]])
+            affected = np.flatnonzero(np.isin(self.parent, roots))
+            self.parent[affected] = affected
+            edges = self.matrix[affected].tocoo()
+            union_edges(self.parent, affected[edges.row], edges.col)
+        union_edges(self.parent, self.pair_source[inserted], self.pair_target[inserted])
+        return self.added, self.removed
+
+    def active(self):
+        # 快照中的节点: 窗口内至少有一条合作边的作者
+        return self.degree > 0
+
+    def component_labels(self):
+        # 活跃节点的连通分量编号 (按最小节点编号依次编号, 与 scipy 一致)
+        nodes = np.flatnonzero(self.active())
+        return np.unique(find_roots(self.parent)[nodes], return_inverse=True)[1].astype(np.int32)
+
+    def clustering_summary(self):
+        # 与 CSRGraph.clustering_summary 相同的键, 只含活跃节点
+        nodes = self.active()
+        triangles = self.triangles[nodes]
+        degree = self.degree[nodes] - 2 * self.loops[nodes]
+        possible = degree * (degree - 1) / 2
+        clustering = np.divide(triangles, possible, out=np.zeros(len(triangles)), where=possible > 0)
+        return {
+            'triangles': triangles,
+            'clustering': clustering,
+            'average_clustering': float(clustering.mean()) if len(triangles) else 0.0,
+            'transitivity': float(triangles.sum() / possible.sum()) if triangles.sum() > 0 else 0.0,
+        }
+
+    def summary(self):
+        labels = self.component_labels()
+        nodes = len(labels)
+        clustering = self.clustering_summary()
+        return {
+            'Start': int(self.window[0]) if len(self.window) else None,
+            'End': int(self.window[-1]) if len(self.window) else None,
+            'Nodes': nodes,
+            'Edges': self.m,
+            'Density': 2 * self.m / (nodes * (nodes - 1)) if nodes > 1 else 0.0,
+            'Components': int(labels.max()) + 1 if nodes else 0,
+            'Largest': int(np.bincount(labels).max()) if nodes else 0,
+            'Average Clustering': clustering['average_clustering'],
+            'Transitivity': clustering['transitivity'],
+            'Total Weight': self.pair_weight.sum(),
+            'Added': self.added,
+            'Removed': self.removed,
+        }
+
+    def graph(self):
+        # 当前快照的 CSRGraph (只含活跃节点, 重新编号), 供中介中心性等需要完整图的指标使用
+        nodes = np.flatnonzero(self.active())
+        mapping = np.full(self.n, -1, dtype=np.int64)
+        mapping[nodes] = np.arange(len(nodes))
+        pairs = np.flatnonzero(self.present > 0)
+        return CSRGraph.from_edges(mapping[self.pair_source[pairs]], mapping[self.pair_target[pairs]],
+                                   self.pair_weight[pairs], self.names[nodes], self.component_labels())
+
+    def trend(self, window=1, step=1, cumulative=False, first=None, last=None):
+        # 逐个快照增量更新并汇总为表格 (每行一个年份区间); first / last 默认为数据中的首末年份
+        if not len(self.years):
+            return pd.DataFrame(columns=TREND_COLUMNS)
+        first = int(self.years[0]) if first is None else first
+        last = int(self.years[-1]) if last is None else last
+        rows = []
+        for start, end in year_windows(first, last, window, step, cumulative):
+            with stage('snapshot', window=[start, end]) as record:
+                self.advance(start, end)
+                row = self.summary()
+                if record is not None:
+                    record['nodes'], record['edges'] = row['Nodes'], row['Edges']
+            row['Start'], row['End'] = start, end
+            rows.append(row)
+        return pd.DataFrame(rows, columns=TREND_COLUMNS)
@@ -1,5 +1,9 @@
 import networkx as nx
 import matplotlib.pyplot as plt
+from layout import graph_layout
+from cache import MetricCache
+from csrgraph import CSRGraph
+from paths import PathIndex
 # 网络可视化
 plt.rcParams['font.family'] = 'serif'
 plt.rcParams['font.serif'] = ['Times New Roman', 'DejaVu Serif']
@@ -28,8 +32,9 @@ ColorGray = '#888888'
 CommunityA = list(range(1, 7))
 CommunityB = list(range(7, 13))
 ClusteringNodes = [1, 2, 3]
-P = nx.dijkstra_path(G, source=1, target=10, weight='weight')
-D = nx.dijkstra_path_length(G, source=1, target=10, weight='weight')
+path_index = PathIndex(CSRGraph.from_networkx(G, 'weight'))
+P = path_index.path(1, 10)
+D = path_index.distance(1, 10)
 
 
 node_colors = {}
@@ -54,7 +59,7 @@ for i, (u, v, d) in enumerate(G.edges(data=True)):
 
 plt.figure(figsize=(12, 9), facecolor='white')
 
-pos = nx.spring_layout(G, k=0.4, iterations=100, seed=42)
+pos = graph_layout(G, seed=42, k=0.4, iterations=100, cache=MetricCache(), slot='test1')
 
 nx.draw_networkx_nodes(G, pos,
                        node_color=list(node_colors.values()),
@@ -93,7 +98,7 @@ legend_handles.append(plt.Line2D([0], [0], marker='o', color='w', label='Communi
 legend_handles.append(plt.Line2D([0], [0], marker='o', color='w', label='Cluster (Green)',
                                  markerfacecolor=ColorGreen, markersize=10, markeredgecolor='k'))
 legend_handles.append(plt.Line2D([0], [0], color=ColorRed, linestyle='-', linewidth=3,
-                                 label=f'Shortest Path (D={D}, Red)'))
+                                 label=f'Shortest Path (D={D:g}, Red)'))
 
 plt.legend(handles=legend_handles, loc='lower left', bbox_to_anchor=(0.0, 0.1),
            frameon=True,
@@ -1,6 +1,9 @@
 import networkx as nx
 import matplotlib.pyplot as plt
-import pandas as pd
+from centrality import centrality_table
+from layout import graph_layout
+from render import draw_networkx_edges
+from cache import MetricCache
 # 指标计算可视化
 
 plt.rcParams['font.family'] = 'serif'
@@ -22,21 +25,14 @@ for u, v, w in EdgeList:
     G.add_edge(u, v, weight=w)
 
 
-centrality_degree = dict(G.degree(weight='weight'))
+# 一次遍历同时得到四种中心性 (权重同时作为距离和影响力权重)
+df_scores = centrality_table(G, weight='weight', weighted_degree=True, max_iter=1000, cache=MetricCache())
+centrality_degree = df_scores['Degree (Weighted)'].to_dict()
+centrality_betweenness = df_scores['Betweenness'].to_dict()
+centrality_closeness = df_scores['Closeness'].to_dict()
+centrality_eigenvector = df_scores['Eigenvector'].to_dict()
 
-centrality_betweenness = nx.betweenness_centrality(G, weight='weight', normalized=True)
-
-centrality_closeness = nx.closeness_centrality(G, distance='weight')
-
-centrality_eigenvector = nx.eigenvector_centrality(G, weight='weight', max_iter=1000)
-
-df_centrality = pd.DataFrame({
-    'Node': Nodes,
-    'Degree (Weighted)': [centrality_degree.get(n, 0) for n in Nodes],
-    'Betweenness': [centrality_betweenness.get(n, 0) for n in Nodes],
-    'Closeness': [centrality_closeness.get(n, 0) for n in Nodes],
-    'Eigenvector': [centrality_eigenvector.get(n, 0) for n in Nodes]
-})
+df_centrality = df_scores.loc[Nodes].rename_axis('Node').reset_index()
 
 print("--- Core Centrality Measure Calculation Results ---")
 print(df_centrality.to_string(index=False, float_format="%.4f"))
@@ -66,7 +62,7 @@ def normalize_colors(scores_dict, cmap_name='viridis'):
 
 
 # Setup plot
-pos = nx.spring_layout(G, k=0.4, iterations=100, seed=42)
+pos = graph_layout(G, seed=42, k=0.4, iterations=100, cache=MetricCache(), slot='test2')
 plt.figure(figsize=(15, 12), facecolor='white')
 
 plot_info = [
@@ -83,7 +79,7 @@ for i, (title, data_dict, cmap_name) in enumerate(plot_info):
     node_color = normalize_colors(data_dict, cmap_name)
 
 
-    nx.draw_networkx_edges(G, pos, ax=ax, width=1.0, alpha=0.3, edge_color='#AAAAAA')
+    draw_networkx_edges(G, pos, ax=ax, width=1.0, alpha=0.3, edge_color='#AAAAAA')
 
 
     nodes = nx.draw_networkx_nodes(G, pos, ax=ax,
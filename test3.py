@@ -1,6 +1,7 @@
 import networkx as nx
 import matplotlib.pyplot as plt
-import pandas as pd
+from centrality import centrality_table
+from cache import MetricCache
 # 例题
 plt.rcParams['font.family'] = 'serif'
 plt.rcParams['font.serif'] = ['Times New Roman', 'DejaVu Serif']
@@ -15,18 +16,13 @@ edges = [
 G.add_nodes_from(nodes)
 G.add_edges_from(edges)
 
-centrality_degree = nx.degree_centrality(G)
-centrality_betweenness = nx.betweenness_centrality(G, normalized=True)
-centrality_closeness = nx.closeness_centrality(G)
-centrality_eigenvector = nx.eigenvector_centrality(G, max_iter=1000)
+df_scores = centrality_table(G, max_iter=1000, cache=MetricCache())
+centrality_degree = df_scores['Degree'].to_dict()
+centrality_betweenness = df_scores['Betweenness'].to_dict()
+centrality_closeness = df_scores['Closeness'].to_dict()
+centrality_eigenvector = df_scores['Eigenvector'].to_dict()
 
-df_centrality = pd.DataFrame({
-    'Node': nodes,
-    'Degree': [centrality_degree.get(n, 0) for n in nodes],
-    'Betweenness': [centrality_betweenness.get(n, 0) for n in nodes],
-    'Closeness': [centrality_closeness.get(n, 0) for n in nodes],
-    'Eigenvector': [centrality_eigenvector.get(n, 0) for n in nodes]
-})
+df_centrality = df_scores.loc[nodes].rename_axis('Node').reset_index()
 
 print("--- Project Team Centrality Scores ---")
 print(df_centrality.to_string(index=False, float_format="%.4f"))
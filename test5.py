@@ -1,8 +1,12 @@
 import networkx as nx
 import matplotlib.pyplot as plt
-import pandas as pd
-from networkx.algorithms.community import modularity
-from sklearn.metrics.cluster import adjusted_rand_score
+import numpy as np
+from centrality import centrality_table
+from csrgraph import CSRGraph
+from structural import structural_holes
+from community import consensus_louvain, labels_to_communities, evaluate_partitions
+from layout import graph_layout
+from cache import MetricCache
 
 plt.rcParams['font.family'] = 'serif'
 plt.rcParams['font.serif'] = ['Times New Roman', 'DejaVu Serif']
@@ -15,53 +19,43 @@ print(f"边数量: {G.number_of_edges()}")
 
 print("\n网络指标")
 density = nx.density(G)
-avg_clustering = nx.average_clustering(G)
+avg_clustering = CSRGraph.from_networkx(G).average_clustering()
 print(f"网络密度: {density:.4f}")
 print(f"平均聚类系数: {avg_clustering:.4f}")
 
-centrality_degree = nx.degree_centrality(G)
-centrality_betweenness = nx.betweenness_centrality(G, normalized=True)
-centrality_closeness = nx.closeness_centrality(G)
-centrality_eigenvector = nx.eigenvector_centrality(G, max_iter=1000)
-structural_constraint = nx.constraint(G)
-
-df_analysis = pd.DataFrame({
-    'Degree': centrality_degree,
-    'Betweenness': centrality_betweenness,
-    'Closeness': centrality_closeness,
-    'Eigenvector': centrality_eigenvector,
-    'Constraint': structural_constraint,
-})
+df_analysis = centrality_table(G, max_iter=1000, cache=MetricCache())
+centrality_degree = df_analysis['Degree'].to_dict()
+centrality_betweenness = df_analysis['Betweenness'].to_dict()
+centrality_closeness = df_analysis['Closeness'].to_dict()
+centrality_eigenvector = df_analysis['Eigenvector'].to_dict()
+graph = CSRGraph.from_networkx(G)
+df_analysis['Constraint'] = structural_holes(graph, weighted=False)['Constraint']
 df_analysis = df_analysis.sort_values(by='Betweenness', ascending=False)
 
 print("\n节点中心性计算")
 print(df_analysis.to_string(float_format="%.4f"))
 
 print("\n社区检测")
-try:
-    from networkx.algorithms.community import louvain_communities
-    communities_detected_sets = list(louvain_communities(G, seed=42))
-except ImportError:
-    communities_detected_sets = list(nx.community.louvain_communities(G, seed=42))
+# 32 个种子的 Louvain 共识划分; 图很小, 单进程运行即可
+consensus = consensus_louvain(graph, runs=32, seed=42, workers=1)
+communities_detected_sets = labels_to_communities(consensus.labels, graph.names)
+print(f"32 次 Louvain 运行的模块度: {consensus.modularity.min():.4f} ~ {consensus.modularity.max():.4f}, "
+      f"平均稳定性: {consensus.stability.mean():.4f}")
 
 print(f"算法自动识别出 {len(communities_detected_sets)} 个 主要社区。")
 
-modularity_score = modularity(G, communities_detected_sets)
-print(f"模块度 (Modularity): {modularity_score:.4f}")
-
-ground_truth_labels = [G.nodes[n]['club'] for n in G.nodes()]
-detected_labels_dict = {}
-for i, community_set in enumerate(communities_detected_sets):
-    for node in community_set:
-        detected_labels_dict[node] = i
-detected_labels = [detected_labels_dict[n] for n in G.nodes()]
-
-ari_score = adjusted_rand_score(ground_truth_labels, detected_labels)
-print(f"调整兰德指数 (ARI Score): {ari_score:.4f}")
+ground_truth_labels = [G.nodes[n]['club'] for n in graph.names]
+# 第 0 行为共识划分, 其后为各次运行, 一次算出全部划分的模块度、ARI 与 NMI
+scores = evaluate_partitions(graph, np.vstack([consensus.labels, consensus.runs]), ground_truth_labels)
+print(f"模块度 (Modularity): {scores['Modularity'][0]:.4f}")
+print(f"调整兰德指数 (ARI Score): {scores['ARI'][0]:.4f}")
+print(f"标准化互信息 (NMI Score): {scores['NMI'][0]:.4f}")
+print(f"各次运行的 ARI: {scores['ARI'][1:].min():.4f} ~ {scores['ARI'][1:].max():.4f}")
+detected_labels_dict = dict(zip(graph.names, consensus.labels))
 
 
 plt.figure(figsize=(20, 9), facecolor='white')
-pos = nx.spring_layout(G, k=0.6, iterations=50, seed=42)
+pos = graph_layout(G, seed=42, k=0.6, iterations=50, cache=MetricCache(), slot='test5')
 ColorHi = '#377EB8'
 ColorJohn = '#FF9933'
 
@@ -0,0 +1,60 @@
+import numpy as np
+
+# 数组化的并查集: parent[i] 指向 i 所在集合中更小的节点, 根为集合中编号最小的节点。
+# 每轮对所有边同时做 "大根挂到小根" 再整体路径压缩, 轮数与集合合并的深度成对数关系
+
+
+def find_roots(parent):
+    # 整体路径压缩 (pointer jumping), 原地修改并返回 parent
+    while True:
+        grand = parent[parent]
+        if np.array_equal(grand, parent):
+            return parent
+        parent[:] = grand
+
+
+def union_edges(parent, source, target):
+    # 把每条边的两个端点合并到同一集合; parent 原地更新, 结束时已完全压缩
+    source = np.asarray(source, dtype=np.int64)
+    target = np.asarray(target, dtype=np.int64)
+    find_roots(parent)
+    while len(source):
+        ru, rv = parent[source], parent[target]
+        pending = ru != rv
+        if not pending.any():
+            break
+        ru, rv = ru[pending], rv[pending]
+        np.minimum.at(parent, np.maximum(ru, rv), np.minimum(ru, rv))
+        find_roots(parent)
+        source, target = source[pending], target[pending]
+    return parent
+
+
+def new_parent(n):
+    return np.arange(n, dtype=np.int64)
+
+
+def grow_parent(parent, n):
+    # 字典末尾追加的新节点各自成为单独的集合
+    return np.concatenate([parent, np.arange(len(parent), n, dtype=np.int64)])
+
+
+def component_parent(labels):
+    # 由保存的分量编号还原并查集: 每个分量的根是其中编号最小的节点
+    labels = np.asarray(labels)
+    first = np.full(labels.max() + 1 if len(labels) else 0, len(labels), dtype=np.int64)
+    np.minimum.at(first, labels, np.arange(len(labels)))
+    return first[labels]
+
+
+def component_table(parent):
+    # 返回 (连通分量编号, 所在分量大小), 均按节点排列; 分量按最小节点编号依次编号,
+    # 与 scipy.sparse.csgraph.connected_components 的编号一致
+    roots = find_roots(parent)
+    _, labels, counts = np.unique(roots, return_inverse=True, return_counts=True)
+    labels = labels.astype(np.int32)
+    return labels, counts[labels].astype(np.int64)
+
+
+def component_labels(n, source, target):
+    return component_table(union_edges(new_parent(n), source, target))